@@ -1,4 +1,5 @@
 import os
+from multiprocessing import freeze_support
 import customtkinter as ctk
 from pathlib import Path
 from dotenv import load_dotenv
@@ -27,6 +28,7 @@ class App(ctk.CTk):
         self.config = load_config()
         self.frames = {}
         self.authRes = None
+        self.tokenProvider = None
 
         # Side Bar
         # FIXME: Other menu still accessible even in not a dev environment
@@ -78,5 +80,9 @@ def environment() -> dict | None:
     return None
 
 
-app = App(start_size=(1190, 620), env=environment())
-app.mainloop()
+if __name__ == "__main__":
+    # Plot workers are spawned processes on Windows; they re-import this
+    # module and must not open another window.
+    freeze_support()
+    app = App(start_size=(1190, 620), env=environment())
+    app.mainloop()
@@ -0,0 +1,197 @@
+"""Compare full `res.json()` decoding with `helper.api.decode`.
+
+Builds synthetic `sys_metrics` and `interfaces` bodies shaped like the API's
+(4 metrics x 90 daily datapoints, 24 interfaces with full config) and reports
+CPU time (best of `--repeat` runs) and retained memory per element for both
+paths. The "full" path is `json.loads`, which is what `res.json()` runs
+today. The fast path parses with orjson when it is installed.
+
+The "merge" rows time a warm cached run: each element fetches the last week
+of its metrics and `MetricCache.merge` completes the series from the days an
+earlier run stored, on dicts for the full path and on the `Datapoints`
+arrays for the fast one.
+
+Usage:
+    python -m benchmark.decode_benchmark --elements 500 --repeat 5
+"""
+
+import argparse
+import json
+import tempfile
+import tracemalloc
+from itertools import cycle
+from pathlib import Path
+from time import perf_counter
+
+from helper.api.decode import FAST_INTERFACES, decode_interfaces, decode_sys_metrics
+from helper.cache import MetricCache
+
+METRICS: tuple[str, ...] = ("CPUUsage", "MemoryUsage", "DiskUsage", "Bandwidth")
+
+
+def day_of(day: int) -> str:
+    return f"2024-{1 + day // 28:02d}-{1 + day % 28:02d}"
+
+
+def sys_metrics_body(days: int = 90, first: int = 0) -> bytes:
+    return json.dumps(
+        {
+            "metrics": [
+                {
+                    "series": [
+                        {
+                            "name": name,
+                            "unit": "percentage",
+                            "statistics": ["average"],
+                            "interval": "1day",
+                            "data": [
+                                {
+                                    "statistics": ["average"],
+                                    "datapoints": [
+                                        {
+                                            "time": f"{day_of(day)}T00:00:00.000Z",
+                                            "value": 12.345 + day,
+                                        }
+                                        for day in range(first, first + days)
+                                    ],
+                                }
+                            ],
+                        }
+                    ]
+                }
+                for name in METRICS
+            ]
+        }
+    ).encode()
+
+
+def interfaces_body(count: int = 24) -> bytes:
+    return json.dumps(
+        {
+            "items": [
+                {
+                    "id": f"17000000000000{port:04d}",
+                    "name": str(port),
+                    "description": "uplink " * 4,
+                    "type": "port",
+                    "admin_up": True,
+                    "mtu": 1500,
+                    "tags": ["wan", "primary"],
+                    "ethernet_port": {"full_duplex": True, "speed": 1000},
+                    "ipv4_config": {
+                        "type": "static",
+                        "static_config": {"address": f"10.0.{port}.1/24"},
+                        "dns_v4_config": {"name_servers": ["8.8.8.8", "1.1.1.1"]},
+                        "routes": [{"destination": "0.0.0.0/0", "via": "10.0.0.254"}],
+                    },
+                    "ipv6_config": None,
+                    "nat_address": None,
+                    "_etag": 3,
+                    "_schema": 5,
+                }
+                for port in range(count)
+            ]
+        }
+    ).encode()
+
+
+def decode_and_merge(decode, cache: MetricCache, elements: int, days: list[str]):
+    # Bodies carry no element id; cycle over the elements the cache holds
+    elementIds = cycle([str(element_id) for element_id in range(elements)])
+
+    def run(body: bytes) -> list[dict]:
+        element_id = next(elementIds)
+        return [
+            cache.merge(
+                element_id=element_id,
+                key=series["name"],
+                series=series,
+                days=days,
+            )
+            for metric in decode(body)["metrics"]
+            for series in metric["series"]
+        ]
+
+    return run
+
+
+def filled_cache(elements: int, days: int = 90) -> MetricCache:
+    # Retention counts back from today, so keep the synthetic 2024 days
+    cache = MetricCache(
+        path=Path(tempfile.mkdtemp()) / "cache.sqlite3", retention_days=100_000
+    )
+    body = json.loads(sys_metrics_body(days=days))
+    for element_id in range(elements):
+        for metric in body["metrics"]:
+            cache.merge(
+                element_id=str(element_id),
+                key=metric["series"][0]["name"],
+                series=metric["series"][0],
+                days=[],
+            )
+    return cache
+
+
+def measure(decode, bodies: list[bytes], repeat: int = 5) -> tuple[float, int]:
+    # Time and memory are taken in separate passes; tracemalloc slows
+    # allocation-heavy code down by several times.
+    elapsed = float("inf")
+    for _ in range(max(repeat, 1)):
+        start = perf_counter()
+        kept = [decode(body) for body in bodies]
+        elapsed = min(elapsed, perf_counter() - start)
+        del kept
+    tracemalloc.start()
+    kept = [decode(body) for body in bodies]
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return elapsed, retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--elements", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(
+        f"fast parser: {'orjson' if FAST_INTERFACES else 'json'},"
+        f" fast interfaces decode {'on' if FAST_INTERFACES else 'off'}"
+    )
+
+    cases = {
+        "sys_metrics": (sys_metrics_body(), json.loads, decode_sys_metrics),
+        "interfaces": (interfaces_body(), json.loads, decode_interfaces),
+    }
+    print(f"{'response':<12} {'path':<8} {'CPU us/elem':>12} {'KiB/elem':>10}")
+    for name, (body, full, fast) in cases.items():
+        bodies = [body] * args.elements
+        for label, decode in (("full", full), ("fast", fast)):
+            elapsed, retained = measure(
+                decode=decode, bodies=bodies, repeat=args.repeat
+            )
+            print(
+                f"{name:<12} {label:<8} {elapsed / args.elements * 1e6:>12.1f}"
+                f" {retained / args.elements / 1024:>10.1f}"
+            )
+
+    cache = filled_cache(elements=args.elements)
+    window = [day_of(day) for day in range(90)]
+    bodies = [sys_metrics_body(days=7, first=83)] * args.elements
+    for label, decode in (("full", json.loads), ("fast", decode_sys_metrics)):
+        elapsed, retained = measure(
+            decode=decode_and_merge(
+                decode=decode, cache=cache, elements=args.elements, days=window
+            ),
+            bodies=bodies,
+            repeat=args.repeat,
+        )
+        print(
+            f"{'merge':<12} {label:<8} {elapsed / args.elements * 1e6:>12.1f}"
+            f" {retained / args.elements / 1024:>10.1f}"
+        )
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Compare static array_split chunking with the shared work queue.
+
+Simulates a bulk run where per-element latency is skewed: most elements
+answer quickly, a minority (retries, slow regions) take many times longer and
+sit next to each other in the site list, as elements of one region do. Each
+element holds one of the worker's request slots for its latency, like a real
+request under `AsyncClient`'s semaphore. The "static" path is the former
+`automate`: the list is cut into one fixed chunk per thread. The "queue" path
+is `BulkEngine.run`: batches go into a shared queue that `drain` empties.
+
+Usage:
+    python -m benchmark.makespan_benchmark --elements 400 --workers 4
+"""
+
+import argparse
+import asyncio
+import queue
+import random
+import threading
+from time import perf_counter
+
+from numpy import array_split
+
+from helper.bulkengine import drain
+
+
+def latencies(elements: int, slow_share: float, seed: int) -> list[float]:
+    rng = random.Random(seed)
+    fast = [rng.lognormvariate(-5.3, 0.4) for _ in range(elements)]
+    slowCount = int(elements * slow_share)
+    # Slow elements are clustered, e.g. one region sorted together
+    slow = [rng.uniform(0.1, 0.2) for _ in range(slowCount)]
+    return fast[: elements - slowCount] + slow
+
+
+async def element(slots: asyncio.Semaphore, latency: float) -> None:
+    async with slots:
+        await asyncio.sleep(latency)
+
+
+async def static_worker(chunk: list[float], concurrency: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+    await asyncio.gather(*(element(slots, latency) for latency in chunk))
+
+
+async def queue_worker(work: queue.Queue, concurrency: int, batch_size: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def batch(items: list[float]) -> None:
+        await asyncio.gather(*(element(slots, latency) for latency in items))
+
+    await drain(work=work, handle=batch, slots=-(-concurrency // batch_size))
+
+
+def run_threads(targets: list) -> float:
+    threads = [
+        threading.Thread(target=asyncio.run, args=(target,)) for target in targets
+    ]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--elements", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--slow-share", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    work = latencies(elements=args.elements, slow_share=args.slow_share, seed=args.seed)
+    ideal = sum(work) / (args.workers * args.concurrency)
+
+    static = run_threads(
+        [
+            static_worker(chunk=chunk.tolist(), concurrency=args.concurrency)
+            for chunk in array_split(work, args.workers)
+        ]
+    )
+    shared: queue.Queue = queue.Queue()
+    for start in range(0, len(work), args.batch_size):
+        shared.put(work[start : start + args.batch_size])
+    dynamic = run_threads(
+        [
+            queue_worker(
+                work=shared, concurrency=args.concurrency, batch_size=args.batch_size
+            )
+            for _ in range(args.workers)
+        ]
+    )
+
+    print(f"{'path':<8} {'makespan s':>10} {'vs ideal':>9}")
+    for label, makespan in (("static", static), ("queue", dynamic)):
+        print(f"{label:<8} {makespan:>10.3f} {makespan / ideal:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
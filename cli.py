@@ -0,0 +1,133 @@
+"""Run the bulk metric report without the GUI.
+
+Credentials come from the same variables as the GUI's `.env`: USER_NAME,
+SECRET_STRING and TSG_ID. With `--tenants`, they come from a JSON list of
+{"name", "username", "secret", "tsg_id"} instead and all tenants run at the
+same time, each into `<output>/<name>/`. Tuning (concurrency, batch size, rate
+limit, caches) is read from the `bulk` section of the user config.
+
+Usage:
+    python cli.py --end 2024-06-30 --days 90 --workers 8 --output /srv/reports
+    python cli.py --tenants tenants.json --report bulk --report bandwidth
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime as dt, timedelta
+from pathlib import Path
+
+from helper.bulkengine import REPORT_FILE_NAME, check_config
+from helper.config import load_config
+from helper.tenants import REPORTS, load_tenants, run_tenant, run_tenants
+
+try:
+    from dotenv import load_dotenv
+except Exception:  # pragma: no cover - optional outside the GUI build
+    load_dotenv = None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    today = dt.combine(dt.now().date(), dt.min.time())
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--end",
+        type=dt.fromisoformat,
+        default=today,
+        help="Last day of the window, YYYY-MM-DD (default: today)",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=90,
+        choices=range(1, 91),
+        metavar="{1..90}",
+        help="Window length in days, as the GUI duration slider (default: 90)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker threads (default: bulk.workers from config)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path.cwd(),
+        help="Directory for the Excel report and plots (default: cwd)",
+    )
+    parser.add_argument("--file-name", default=REPORT_FILE_NAME)
+    parser.add_argument("--plots", action="store_true", help="Render metric plots")
+    parser.add_argument(
+        "--datapoints",
+        action="store_true",
+        help="Also export the daily datapoints as a long CSV table",
+    )
+    parser.add_argument(
+        "--refresh-cache", action="store_true", help="Ignore cached API data"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip elements finished by an interrupted run over the same window",
+    )
+    parser.add_argument(
+        "--report",
+        action="append",
+        choices=REPORTS,
+        help="Report to run, repeatable (default: bulk)",
+    )
+    parser.add_argument(
+        "--tenants",
+        type=Path,
+        default=None,
+        help="JSON file of tenants to run concurrently instead of the .env one",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    end = dt.combine(args.end.date(), dt.min.time())
+    reports = args.report or ["bulk"]
+    bulkConfig = load_config().get("bulk", {})
+    if "bulk" in reports:
+        try:
+            check_config(bulkConfig=bulkConfig)
+        except ValueError as error:
+            print(f"Invalid bulk config: {error}", file=sys.stderr)
+            return 2
+    options = {
+        "start": end - timedelta(days=args.days - 1),
+        "end": end,
+        "reports": reports,
+        "config": bulkConfig,
+        "workers": args.workers,
+        "generate_plots": args.plots,
+        "refresh_cache": args.refresh_cache,
+        "resume": args.resume,
+        "file_name": args.file_name,
+        "datapoints": args.datapoints,
+    }
+    if args.tenants is not None:
+        results = run_tenants(
+            tenants=load_tenants(args.tenants), output=args.output, **options
+        )
+        return 1 if any(isinstance(res, Exception) for res in results.values()) else 0
+
+    if load_dotenv is not None:
+        load_dotenv(dotenv_path="./.env")
+    credentials = {
+        "username": os.getenv("USER_NAME"),
+        "secret": os.getenv("SECRET_STRING"),
+        "tsg_id": os.getenv("TSG_ID"),
+    }
+    if not all(credentials.values()):
+        print("USER_NAME, SECRET_STRING and TSG_ID must be set", file=sys.stderr)
+        return 2
+    run_tenant(tenant=credentials, dest_dir=args.output, **options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
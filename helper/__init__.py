@@ -1,4 +0,0 @@
-from helper.filehandler import FileHandler
-from helper.terminalredirect import StdErrTerminalRedirect, StdOutTerminalRedirect
-
-from helper.api import *
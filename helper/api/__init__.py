@@ -1,3 +1,4 @@
 from helper.api.auth import Login, Profile
 from helper.api.getlist import SiteOfTenant, ElementOfTenant
 from helper.api.monitor import SysMetric
+from helper.api.session import get_session, new_session, configure_pool
@@ -0,0 +1,180 @@
+import asyncio
+import aiohttp
+from inspect import signature
+from time import perf_counter
+from typing import Callable
+from tenacity import retry, stop_after_attempt
+
+from helper.api.decode import (
+    FAST_INTERFACES,
+    decode_interfaces,
+    decode_sys_metrics,
+    loads,
+)
+from helper.api.ratelimit import RateLimiter, limiter, limiter_wait
+from helper.api.session import DEFAULT_HEADERS
+from helper.api.singleflight import flights
+from helper.api.tokenprovider import TokenProvider, resolve_token
+from helper.runstats import RunStats
+
+DEFAULT_CONCURRENCY = 16
+
+
+def count_retry(retry_state) -> None:
+    """Tenacity `before_sleep` hook counting retries on the client's stats"""
+    client = retry_state.args[0]
+    if client.stats is not None:
+        kind = retry_state.kwargs.get("kind")
+        if kind is None:
+            kind = signature(retry_state.fn).parameters["kind"].default
+        client.stats.retry(kind=kind)
+
+
+class AsyncClient:
+    """Non-blocking counterpart of `helper.api.plainfunc`
+
+    One client owns an aiohttp session and a semaphore. The semaphore bounds
+    how many requests are in flight at once, so a single event loop can keep
+    many requests waiting on the network. Requests still take their turn on
+    the shared `RateLimiter`, same as the blocking clients. With
+    `fast_decode`, responses go through `helper.api.decode` and keep only the
+    fields the reports read, in compact arrays; interface lists only when
+    orjson is installed (`FAST_INTERFACES`). With `stats`, every request
+    is timed and counted under its `kind`.
+
+    Usage:
+        async with AsyncClient(concurrency=16) as client:
+            res = await client.system_metric(bearer_token=token, body=body)
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        base_url: str = "https://api.sase.paloaltonetworks.com",
+        rate_limiter: RateLimiter = limiter,
+        fast_decode: bool = False,
+        stats: RunStats | None = None,
+    ) -> None:
+        self.concurrency = max(int(concurrency), 1)
+        self.baseUrl = base_url
+        self.limiter = rate_limiter
+        self.fastDecode = fast_decode
+        self.fastInterfaces = fast_decode and FAST_INTERFACES
+        self.stats = stats
+        self.semaphore: asyncio.Semaphore | None = None
+        self.session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> "AsyncClient":
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            headers=DEFAULT_HEADERS,
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        bearer_token: str | TokenProvider,
+        headers: dict,
+        decode: Callable[[bytes], dict] | None = None,
+        kind: str = "request",
+        **kwargs,
+    ) -> dict:
+        token = resolve_token(bearer_token)
+        async with self.semaphore:
+            for canRefresh in (isinstance(bearer_token, TokenProvider), False):
+                await self.limiter.acquire_async()
+                started, status, size = perf_counter(), 0, 0
+                try:
+                    async with self.session.request(
+                        method=method,
+                        url=url,
+                        headers={**headers, "Authorization": f"Bearer {token}"},
+                        **kwargs,
+                    ) as res:
+                        status = res.status
+                        self.limiter.observe(
+                            status=res.status,
+                            retry_after=res.headers.get("Retry-After"),
+                        )
+                        body = await res.read()
+                        size = len(body)
+                        if not (canRefresh and res.status == 401):
+                            res.raise_for_status()
+                            if decode is not None and self.fastDecode:
+                                return {"status": res.status, "data": decode(body)}
+                            return {"status": res.status, "data": loads(body)}
+                finally:
+                    if self.stats is not None:
+                        self.stats.request(
+                            kind=kind,
+                            seconds=perf_counter() - started,
+                            status=status,
+                            size=size,
+                        )
+                token = await bearer_token.refresh_async(stale=token)
+
+    async def get_all_interfaces(
+        self,
+        bearer_token: str | TokenProvider,
+        site_id: str,
+        element_id: str,
+        kind: str = "interfaces",
+    ) -> dict:
+        url = f"{self.baseUrl}/sdwan/v4.21/api/sites/{site_id}/elements/{element_id}/interfaces"
+        # Shares keys with `plainfunc.get_all_interfaces`; compact decodes
+        # hold fewer fields and get a key of their own.
+        key = ("GET", url, resolve_token(bearer_token))
+        return await flights.do_async(
+            key=key + ("compact",) if self.fastInterfaces else key,
+            fn=lambda: self._get_interfaces(
+                bearer_token=bearer_token, url=url, kind=kind
+            ),
+        )
+
+    @retry(
+        stop=stop_after_attempt(7),
+        wait=limiter_wait,
+        before_sleep=count_retry,
+        reraise=True,
+    )
+    async def _get_interfaces(
+        self, bearer_token: str | TokenProvider, url: str, kind: str = "interfaces"
+    ) -> dict:
+        return await self._request(
+            method="GET",
+            url=url,
+            bearer_token=bearer_token,
+            headers={"Content-Type": "application/json"},
+            decode=decode_interfaces if self.fastInterfaces else None,
+            kind=kind,
+        )
+
+    @retry(
+        stop=stop_after_attempt(7),
+        wait=limiter_wait,
+        before_sleep=count_retry,
+        reraise=True,
+    )
+    async def system_metric(
+        self, bearer_token: str | TokenProvider, body: dict, kind: str = "sys_metrics"
+    ) -> dict:
+        return await self._request(
+            method="POST",
+            url=f"{self.baseUrl}/sdwan/monitor/v2.3/api/monitor/sys_metrics",
+            bearer_token=bearer_token,
+            headers={"X-PANW-Region": "sg", "Content-Type": "application/json"},
+            decode=decode_sys_metrics,
+            kind=kind,
+            json=body,
+        )
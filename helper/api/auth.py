@@ -1,6 +1,8 @@
 from requests.auth import HTTPBasicAuth
 import requests
 
+from helper.api.session import get_session
+
 
 class Login:
     """
@@ -13,11 +15,13 @@ class Login:
         secret: str,
         tsg_id: int,
         url: str = "https://auth.apps.paloaltonetworks.com/auth/v1/oauth2/access_token",
+        session: requests.Session | None = None,
     ) -> None:
         self.username = username
         self.secret = secret
         self.tsgId = tsg_id
         self.url = url
+        self.session = session
         self.data = {
             "grant_type": "client_credentials",
             "scope": f"tsg_id:{self.tsgId}",
@@ -25,13 +29,12 @@ class Login:
 
     def request(self) -> dict:
         try:
-            res = requests.post(
+            res = (self.session or get_session()).post(
                 url=self.url,
                 data=self.data,
                 auth=HTTPBasicAuth(username=self.username, password=self.secret),
                 headers={
                     "Content-Type": "application/x-www-form-urlencoded",
-                    "User-Agent": "NTTIndonesia-PANBA/1.2.5",
                 },
             )
             res.raise_for_status()
@@ -55,11 +58,9 @@ class Profile:
 
     def request(self):
         try:
-            res = requests.get(
+            res = get_session().get(
                 url=self.url,
                 headers={
-                    "Accept": "application/json",
-                    "User-Agent": "NTTIndonesia-PANBA/1.2.5",
                     "Authorization": f"Bearer {self.bearerToken}",
                 },
             )
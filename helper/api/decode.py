@@ -0,0 +1,119 @@
+import json
+from collections.abc import Sequence
+
+import numpy as np
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional speed-up
+    orjson = None  # type: ignore
+
+# Trimming interface items only pays off when orjson does the parsing; with
+# the stdlib the trim comes on top of a full json.loads and is slower
+FAST_INTERFACES: bool = orjson is not None
+# Everything `processing.PORT_FIELDS` can report has to survive decoding
+INTERFACE_FIELDS: tuple[str, ...] = (
+    "id",
+    "name",
+    "ipv4_config",
+    "admin_up",
+    "used_for",
+    "mac_address",
+)
+
+
+def loads(raw: bytes | str):
+    """Parse JSON with orjson when installed, the stdlib otherwise"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class Datapoints(Sequence):
+    """Compact time/value pairs of one series
+
+    Holds two numpy arrays instead of one dict per point. Indexing and
+    iteration still yield `{"time": ..., "value": ...}` dicts, built on the
+    fly, so code written against the raw response keeps working; new code
+    reads `times` and `values` directly.
+    """
+
+    __slots__ = ("times", "values")
+
+    def __init__(self, times: np.ndarray, values: np.ndarray) -> None:
+        self.times = times
+        self.values = values
+
+    @classmethod
+    def from_points(cls, points: list[dict]) -> "Datapoints":
+        times = np.array(
+            [point["time"].rstrip("Z") for point in points], dtype="datetime64[ms]"
+        )
+        # None becomes NaN under a float dtype
+        values = np.array([point["value"] for point in points], dtype=np.float64)
+        return cls(times=times, values=values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Datapoints(times=self.times[index], values=self.values[index])
+        value = self.values[index]
+        return {
+            "time": f"{np.datetime_as_string(self.times[index], unit='ms')}Z",
+            "value": None if np.isnan(value) else float(value),
+        }
+
+
+def _compact_series(series: dict) -> dict:
+    compact = {
+        "name": series.get("name"),
+        "unit": series.get("unit"),
+        "data": [
+            {"datapoints": Datapoints.from_points(data.get("datapoints", []))}
+            for data in series.get("data", [])
+        ],
+    }
+    if "view" in series:
+        compact["view"] = series["view"]
+    return compact
+
+
+def decode_sys_metrics(raw: bytes | str) -> dict:
+    """Decode a `sys_metrics` body keeping only what the reports read
+
+    Args:
+        raw (bytes | str): Response body
+
+    Returns:
+        dict: `{"metrics": [{"series": [...]}]}` with `name`, `unit`, `view` and compact `Datapoints`
+    """
+    body = loads(raw)
+    return {
+        "metrics": [
+            {"series": [_compact_series(series) for series in metric.get("series", [])]}
+            for metric in body.get("metrics", [])
+        ]
+    }
+
+
+def decode_interfaces(
+    raw: bytes | str, fields: tuple[str, ...] = INTERFACE_FIELDS
+) -> dict:
+    """Decode an `interfaces` body keeping only the listed item fields
+
+    Args:
+        raw (bytes | str): Response body
+        fields (tuple[str, ...], optional): Item keys to keep. Defaults to INTERFACE_FIELDS.
+
+    Returns:
+        dict: `{"items": [...]}` with the trimmed interface items
+    """
+    body = loads(raw)
+    return {
+        "items": [
+            {field: item[field] for field in fields if field in item}
+            for item in body.get("items", [])
+        ]
+    }
@@ -1,5 +1,14 @@
 import requests
 from json import dumps
+from typing import Iterator
+
+from helper.api.session import get_session
+from helper.api.singleflight import flights
+
+try:
+    import ijson  # type: ignore
+except Exception:  # pragma: no cover - optional streaming parser
+    ijson = None  # type: ignore
 
 
 class SiteOfTenant:
@@ -8,14 +17,17 @@ class SiteOfTenant:
     ) -> None:
         self.baseUrl = base_url
         self.bearerToken = bearer_token
+        self.url = f"{self.baseUrl}/sdwan/v4.8/api/sites"
 
     def request(self) -> dict:
+        """All sites of the tenant, as `{"status", "data": {"items": [...]}}`"""
+        return flights.do(key=("GET", self.url, self.bearerToken), fn=self.fetch)
+
+    def fetch(self) -> dict:
         try:
-            res = requests.get(
-                url=f"{self.baseUrl}/sdwan/v4.8/api/sites",
+            res = get_session().get(
+                url=self.url,
                 headers={
-                    "Accept": "application/json",
-                    "User-Agent": "NTTIndonesia-PANBA/1.2.5",
                     "Authorization": f"Bearer {self.bearerToken}",
                 },
             )
@@ -31,18 +43,25 @@ class SiteOfTenant:
 
 class ElementOfTenant:
     def __init__(
-        self, bearer_token: str, base_url: str = "https://api.sase.paloaltonetworks.com"
+        self,
+        bearer_token: str,
+        base_url: str = "https://api.sase.paloaltonetworks.com",
+        session: requests.Session | None = None,
     ) -> None:
         self.baseUrl = base_url
         self.bearerToken = bearer_token
+        self.session = session
+        self.url = f"{self.baseUrl}/sdwan/v3.1/api/elements"
 
-    def request(self):
+    def request(self) -> dict:
+        """All ION elements of the tenant, as `{"status", "data": {"items": [...]}}`"""
+        return flights.do(key=("GET", self.url, self.bearerToken), fn=self.fetch)
+
+    def fetch(self) -> dict:
         try:
-            res = requests.get(
-                url=f"{self.baseUrl}/sdwan/v3.1/api/elements",
+            res = (self.session or get_session()).get(
+                url=self.url,
                 headers={
-                    "Accept": "application/json",
-                    "User-Agent": "NTTIndonesia-PANBA/1.2.5",
                     "Authorization": f"Bearer {self.bearerToken}",
                 },
             )
@@ -62,20 +81,44 @@ class RemoteNetworkBandwidth:
         bearer_token: str,
         body: dict,
         base_url: str = "https://pa-id01.api.prismaaccess.com",
+        session: requests.Session | None = None,
     ) -> None:
         self.body = body
         self.baseUrl = base_url
         self.bearerToken = bearer_token
+        self.session = session
+
+    @staticmethod
+    def last_n_days(properties: list[str], days: int) -> dict:
+        """Build the `rn_list` query body over the last `days` days
+
+        Args:
+            properties (list[str]): Properties to return per row
+            days (int): Window length in days
+
+        Returns:
+            dict: Request body for `RemoteNetworkBandwidth`
+        """
+        return {
+            "properties": [{"property": prop} for prop in properties],
+            "filter": {
+                "rules": [
+                    {
+                        "property": "event_time",
+                        "operator": "last_n_days",
+                        "values": [int(days)],
+                    }
+                ]
+            },
+        }
 
     def request(self):
         try:
-            res = requests.post(
+            res = (self.session or get_session()).post(
                 url=f"{self.baseUrl}/api/sase/v3.0/resource/query/sites/rn_list",
                 data=dumps(self.body),
                 headers={
-                    "Accept": "application/json",
                     "Content-Type": "application/json",
-                    "User-Agent": "NTTIndonesia-PANBA/1.2.5",
                     "Authorization": f"Bearer {self.bearerToken}",
                 },
             )
@@ -88,6 +131,51 @@ class RemoteNetworkBandwidth:
             print(f"Something Went Wrong {requestException} {res}")
             raise
 
+    def iter_rows(self, chunk_size: int = 5000) -> Iterator[list[dict]]:
+        """Stream the `data` rows of the response in chunks
+
+        The gzip body is decompressed and parsed as it arrives, so only one
+        chunk of rows is held at a time. Without `ijson` installed the body
+        is parsed whole and then sliced.
+
+        Args:
+            chunk_size (int, optional): Rows per yielded chunk. Defaults to 5000.
+
+        Yields:
+            Iterator[list[dict]]: Consecutive chunks of rows
+        """
+        try:
+            with (self.session or get_session()).post(
+                url=f"{self.baseUrl}/api/sase/v3.0/resource/query/sites/rn_list",
+                data=dumps(self.body),
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.bearerToken}",
+                },
+                stream=True,
+            ) as res:
+                res.raise_for_status()
+                if ijson is None:
+                    rows = res.json()["data"]
+                    for start in range(0, len(rows), chunk_size):
+                        yield rows[start : start + chunk_size]
+                    return
+                res.raw.decode_content = True
+                chunk: list[dict] = []
+                for row in ijson.items(res.raw, "data.item", use_float=True):
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+        except requests.exceptions.HTTPError as httpError:
+            print(f"Http Error {httpError} {res.headers} {res.text}")
+            raise
+        except requests.exceptions.RequestException as requestException:
+            print(f"Something Went Wrong {requestException}")
+            raise
+
 
 class GetAllInterfaces:
     def __init__(
@@ -101,15 +189,18 @@ class GetAllInterfaces:
         self.bearerToken = bearer_token
         self.siteId = site_id
         self.elementId = element_id
+        self.url = f"{self.baseUrl}/sdwan/v4.21/api/sites/{self.siteId}/elements/{self.elementId}/interfaces"
 
-    def request(self):
+    def request(self) -> dict:
+        """Interfaces of one element, as `{"status", "data": {"items": [...]}}`"""
+        return flights.do(key=("GET", self.url, self.bearerToken), fn=self.fetch)
+
+    def fetch(self) -> dict:
         try:
-            res = requests.get(
-                url=f"{self.baseUrl}/sdwan/v4.21/api/sites/{self.siteId}/elements/{self.elementId}/interfaces",
+            res = get_session().get(
+                url=self.url,
                 headers={
-                    "Accept": "application/json",
                     "Content-Type": "application/json",
-                    "User-Agent": "NTTIndonesia-PANBA/1.2.5",
                     "Authorization": f"Bearer {self.bearerToken}",
                 },
             )
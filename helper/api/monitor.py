@@ -1,6 +1,8 @@
 import json
 import requests
 
+from helper.api.session import get_session
+
 
 class SysMetric:
     def __init__(
@@ -15,15 +17,13 @@ class SysMetric:
 
     def request(self) -> dict:
         try:
-            res = requests.post(
+            res = get_session().post(
                 url=f"{self.baseUrl}/sdwan/monitor/v2.3/api/monitor/sys_metrics",
                 data=json.dumps(self.body),
                 # data='{"start_time":"2024-04-19T06:05:00.000Z","end_time":"2024-04-19T06:34:00.000Z","interval":"1min","metrics":[{"name":"MemoryUsage","statistics":["average"],"unit":"percentage"},{"name":"CPUUsage","statistics":["average"],"unit":"percentage"},{"name":"DiskUsage","statistics":["average"],"unit":"percentage"}],"filter":{"site":["1696663173285010327"],"element":["1696666533144019927"]}}',
                 headers={
                     "X-PANW-Region": "sg",
-                    "Accept": "application/json",
                     "Content-Type": "application/json",
-                    "User-Agent": "NTTIndonesia-PANBA/1.2.5",
                     "Authorization": f"Bearer {self.bearerToken}",
                 },
             )
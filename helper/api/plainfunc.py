@@ -1,26 +1,40 @@
-import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, stop_after_attempt
+
+from helper.api.ratelimit import limiter_wait
+from helper.api.session import get_session
+from helper.api.singleflight import flights
+from helper.api.tokenprovider import TokenProvider, resolve_token, send_authorized
 
 
-@retry(
-    stop=stop_after_attempt(7),
-    wait=wait_exponential(multiplier=1, min=5, max=30),
-    reraise=True,
-)
 def get_all_interfaces(
-    bearer_token: str,
+    bearer_token: str | TokenProvider,
     site_id: str,
     element_id: str,
     base_url: str = "https://api.sase.paloaltonetworks.com",
 ) -> dict:
-    res = requests.get(
-        url=f"{base_url}/sdwan/v4.21/api/sites/{site_id}/elements/{element_id}/interfaces",
-        headers={
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "User-Agent": "NTTIndonesia-PANBA/1.2.5",
-            "Authorization": f"Bearer {bearer_token}",
-        },
+    url = f"{base_url}/sdwan/v4.21/api/sites/{site_id}/elements/{element_id}/interfaces"
+    # Identical concurrent calls, retries included, share one request
+    return flights.do(
+        key=("GET", url, resolve_token(bearer_token)),
+        fn=lambda: _get_interfaces(bearer_token=bearer_token, url=url),
+    )
+
+
+@retry(
+    stop=stop_after_attempt(7),
+    wait=limiter_wait,
+    reraise=True,
+)
+def _get_interfaces(bearer_token: str | TokenProvider, url: str) -> dict:
+    res = send_authorized(
+        send=lambda token: get_session().get(
+            url=url,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}",
+            },
+        ),
+        bearer_token=bearer_token,
     )
     res.raise_for_status()
     return {"status": res.status_code, "data": res.json()}
@@ -28,24 +42,25 @@ def get_all_interfaces(
 
 @retry(
     stop=stop_after_attempt(7),
-    wait=wait_exponential(multiplier=1, min=5, max=30),
+    wait=limiter_wait,
     reraise=True,
 )
 def system_metric(
-    bearer_token: str,
+    bearer_token: str | TokenProvider,
     body: dict,
     base_url: str = "https://api.sase.paloaltonetworks.com",
 ) -> dict:
-    res = requests.post(
-        url=f"{base_url}/sdwan/monitor/v2.3/api/monitor/sys_metrics",
-        json=body,
-        headers={
-            "X-PANW-Region": "sg",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "User-Agent": "NTTIndonesia-PANBA/1.2.5",
-            "Authorization": f"Bearer {bearer_token}",
-        },
+    res = send_authorized(
+        send=lambda token: get_session().post(
+            url=f"{base_url}/sdwan/monitor/v2.3/api/monitor/sys_metrics",
+            json=body,
+            headers={
+                "X-PANW-Region": "sg",
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}",
+            },
+        ),
+        bearer_token=bearer_token,
     )
     res.raise_for_status()
     return {"status": res.status_code, "data": res.json()}
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep
+from tenacity import wait_exponential
+
+DEFAULT_RATE = 10.0
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a `Retry-After` header into seconds
+
+    Args:
+        value (str | None): Header value, either delay-seconds or an HTTP-date
+
+    Returns:
+        float | None: Seconds to wait, None if absent or unreadable
+    """
+    if value is None or value == "":
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retryAt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retryAt.tzinfo is None:
+        retryAt = retryAt.replace(tzinfo=timezone.utc)
+    return max((retryAt - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimiter:
+    """Adaptive token bucket shared by every API call
+
+    Each request takes one token. On 429 (or a `Retry-After`) the refill rate
+    is halved and every caller is held back until the server's retry time;
+    each successful response adds the rate back a step at a time, up to
+    `max_rate`. This is additive-increase / multiplicative-decrease.
+    """
+
+    def __init__(
+        self,
+        max_rate: float = DEFAULT_RATE,
+        min_rate: float = 0.5,
+        burst: int | None = None,
+        increase: float = 0.2,
+        decrease: float = 0.5,
+    ) -> None:
+        self._lock = threading.Lock()
+        self.maxRate = float(max_rate)
+        self.minRate = float(min_rate)
+        self.burst = float(burst if burst is not None else max(int(max_rate), 1))
+        self.increase = increase
+        self.decrease = decrease
+        self.rate = self.maxRate
+        self.tokens = self.burst
+        self.updated = monotonic()
+        self.blockedUntil = 0.0
+        self.lastCut = 0.0
+
+    def configure(self, max_rate: float, burst: int | None = None) -> None:
+        with self._lock:
+            self.maxRate = max(float(max_rate), self.minRate)
+            self.burst = float(burst if burst is not None else max(int(max_rate), 1))
+            self.rate = min(self.rate, self.maxRate)
+            self.tokens = min(self.tokens, self.burst)
+
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller has to wait for it"""
+        with self._lock:
+            now = monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blockedUntil - now)
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            sleep(wait)
+
+    async def acquire_async(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            now = monotonic()
+            # Requests already in flight when the first 429 hit will report
+            # too; cut the rate once per cooldown instead of once per reply.
+            if now - self.lastCut > max(1.0 / self.rate, 1.0):
+                self.rate = max(self.minRate, self.rate * self.decrease)
+                self.lastCut = now
+            self.tokens = min(self.tokens, 0.0)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self.blockedUntil = max(self.blockedUntil, now + pause)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            if self.rate < self.maxRate:
+                self.rate = min(self.maxRate, self.rate + self.increase)
+
+    def observe(self, status: int, retry_after: str | None = None) -> None:
+        """Feed a response status back into the limiter
+
+        Args:
+            status (int): HTTP status code
+            retry_after (str | None, optional): Raw `Retry-After` header. Defaults to None.
+        """
+        if status == 429 or (status == 503 and retry_after):
+            self.throttled(retry_after=parse_retry_after(retry_after))
+        elif status < 400:
+            self.succeeded()
+
+
+limiter = RateLimiter()
+
+
+def is_throttled(error: BaseException | None) -> bool:
+    """Whether an exception from requests or aiohttp is an HTTP 429"""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    return status == 429
+
+
+_backoff = wait_exponential(multiplier=1, min=5, max=30)
+
+
+def limiter_wait(retry_state) -> float:
+    """Tenacity wait that leaves throttled retries to the shared limiter
+
+    A 429 already paused every worker through `RateLimiter.throttled`, so the
+    retry only has to queue for its next token. Other failures keep the
+    exponential back-off.
+    """
+    if is_throttled(retry_state.outcome.exception()):
+        return 0
+    return _backoff(retry_state)
@@ -0,0 +1,110 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from helper.api.ratelimit import RateLimiter, limiter
+
+USER_AGENT = "NTTIndonesia-PANBA/1.2.5"
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": USER_AGENT,
+}
+DEFAULT_POOL_SIZE = 10
+
+
+class LimitedSession(requests.Session):
+    """Session whose every request goes through a `RateLimiter`"""
+
+    def __init__(self, rate_limiter: RateLimiter = limiter) -> None:
+        super().__init__()
+        self.limiter = rate_limiter
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        self.limiter.acquire()
+        res = super().request(method, url, *args, **kwargs)
+        self.limiter.observe(
+            status=res.status_code, retry_after=res.headers.get("Retry-After")
+        )
+        return res
+
+
+_lock = threading.Lock()
+_session: LimitedSession | None = None
+_poolSize: int = DEFAULT_POOL_SIZE
+
+
+def _mount_adapters(session: requests.Session, pool_size: int) -> None:
+    replaced = {session.adapters.get(prefix) for prefix in ("https://", "http://")}
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Release the pooled connections of the adapters just replaced
+    for old in replaced:
+        if old is not None:
+            old.close()
+
+
+def new_session(
+    rate_limiter: RateLimiter = limiter, pool_size: int = DEFAULT_POOL_SIZE
+) -> LimitedSession:
+    """Create a keep-alive session with its own pool and rate limiter
+
+    Used where one budget must not be shared, e.g. one session per tenant.
+
+    Args:
+        rate_limiter (RateLimiter, optional): Limiter every request waits on.
+            Defaults to the process wide `limiter`.
+        pool_size (int, optional): Maximum number of kept-alive connections
+            per host. Defaults to DEFAULT_POOL_SIZE.
+
+    Returns:
+        LimitedSession: New session with default headers
+    """
+    session = LimitedSession(rate_limiter=rate_limiter)
+    session.headers.update(DEFAULT_HEADERS)
+    _mount_adapters(session=session, pool_size=max(int(pool_size), 1))
+    return session
+
+
+def get_session() -> LimitedSession:
+    """Shared keep-alive session used by every API client
+
+    The session is created lazily on first use. Connections are pooled per
+    host by the mounted adapter, which is safe to share between threads, and
+    every request waits on the shared rate limiter.
+
+    Returns:
+        LimitedSession: Process wide session with default headers
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = new_session(pool_size=_poolSize)
+    return _session
+
+
+def configure_pool(pool_size: int) -> None:
+    """Resize the connection pool, e.g. to match the worker count
+
+    Args:
+        pool_size (int): Maximum number of kept-alive connections per host.
+    """
+    global _poolSize
+    pool_size = max(int(pool_size), 1)
+    with _lock:
+        if pool_size == _poolSize:
+            return
+        _poolSize = pool_size
+        if _session is not None:
+            _mount_adapters(session=_session, pool_size=pool_size)
+
+
+def close_session() -> None:
+    """Close the shared session and drop all pooled connections"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
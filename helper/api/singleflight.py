@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from time import monotonic
+from typing import Any
+
+DEFAULT_TTL = 30.0
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class SingleFlight:
+    """Share one call between identical concurrent requests
+
+    The first caller of a key runs the request; callers with the same key
+    arriving while it is in flight wait for it and get the same decoded
+    result, or the same exception. A successful result is then kept for
+    `ttl` seconds, so repeats within that window skip the network as well.
+    Waiting works across threads and event loops, as the result is handed
+    over through a `concurrent.futures.Future`.
+
+    Results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.maxEntries = max(int(max_entries), 1)
+        self._inflight: dict[Hashable, Future] = {}
+        self._memo: dict[Hashable, tuple[float, Any]] = {}
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        """Return the future to wait on and whether the caller has to run it"""
+        with self._lock:
+            memo = self._memo.get(key)
+            if memo is not None:
+                if memo[0] > monotonic():
+                    future: Future = Future()
+                    future.set_result(memo[1])
+                    return future, False
+                del self._memo[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            # A running future cannot be cancelled by one waiter for all
+            future.set_running_or_notify_cancel()
+            return future, True
+
+    def _land(
+        self,
+        key: Hashable,
+        future: Future,
+        result: Any = None,
+        error: BaseException | None = None,
+    ) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None and self.ttl > 0:
+                now = monotonic()
+                if len(self._memo) >= self.maxEntries:
+                    for stale in [k for k, v in self._memo.items() if v[0] <= now]:
+                        del self._memo[stale]
+                if len(self._memo) >= self.maxEntries:
+                    # Insertion order, so the first entry is the oldest
+                    del self._memo[next(iter(self._memo))]
+                self._memo[key] = (now + self.ttl, result)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run `fn` once for every concurrent caller of `key`
+
+        Args:
+            key (Hashable): Identity of the request, e.g. method, URL and token
+            fn (Callable[[], Any]): Performs the request
+
+        Returns:
+            Any: Result of `fn`, possibly from another caller
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as error:
+            self._land(key=key, future=future, error=error)
+            raise
+        self._land(key=key, future=future, result=result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Coroutine counterpart of `do`, sharing keys with it
+
+        Args:
+            key (Hashable): Identity of the request, e.g. method, URL and token
+            fn (Callable[[], Awaitable[Any]]): Returns the request coroutine
+
+        Returns:
+            Any: Result of `fn`, possibly from another caller
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await fn()
+        except BaseException as error:
+            self._land(key=key, future=future, error=error)
+            raise
+        self._land(key=key, future=future, result=result)
+        return result
+
+
+# Shared by every GET of the site, element and interface lists (`getlist`,
+# `plainfunc` and `AsyncClient`), keyed on method, URL and token, so their
+# results are shared between callers and must be treated as read-only.
+flights = SingleFlight()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import threading
+from time import monotonic
+from typing import Callable
+
+import requests
+
+from helper.api.auth import Login
+
+log = logging.getLogger(__name__)
+
+
+class TokenProvider:
+    """Owns the bearer token and keeps it fresh for every client
+
+    A daemon thread logs in again `margin` seconds before the current token
+    expires. Readers use `token`, which never blocks; during a refresh they
+    keep getting the old token, which is still valid. A client that gets a
+    401 calls `refresh(stale=...)`: only the first caller logs in again, the
+    others wait for it and get the new token.
+    """
+
+    def __init__(
+        self,
+        login: Login,
+        margin: float = 60,
+        on_refresh: Callable[[dict], None] | None = None,
+    ) -> None:
+        self.login = login
+        self.margin = margin
+        self.onRefresh = on_refresh
+        self.authRes: dict | None = None
+        self.expiresAt: float = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def token(self) -> str | None:
+        authRes = self.authRes
+        return authRes["data"]["access_token"] if authRes is not None else None
+
+    def start(self) -> dict:
+        """Log in and start the background refresher
+
+        Returns:
+            dict: Login response, same shape as `Login.request`
+        """
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self.authRes
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def refresh(self, stale: str | None = None) -> str:
+        """Fetch a new token, once, however many callers ask for it
+
+        Args:
+            stale (str | None, optional): Token the caller saw rejected; skip the login if it was already replaced. Defaults to None.
+
+        Returns:
+            str: Current bearer token
+        """
+        with self._lock:
+            if stale is not None and self.token != stale:
+                return self.token
+            authRes = self.login.request()
+            expiresIn = authRes.get("data", {}).get("expires_in", 60 * 15)
+            self.expiresAt = monotonic() + expiresIn
+            self.authRes = authRes
+        if self.onRefresh is not None:
+            self.onRefresh(authRes)
+        return self.token
+
+    async def refresh_async(self, stale: str | None = None) -> str:
+        return await asyncio.to_thread(self.refresh, stale)
+
+    def _run(self) -> None:
+        retryIn: float | None = None
+        while True:
+            wait = (
+                retryIn
+                if retryIn is not None
+                else max(self.expiresAt - self.margin - monotonic(), 1)
+            )
+            if self._stop.wait(timeout=wait):
+                return
+            try:
+                self.refresh()
+                retryIn = None
+            except Exception as error:
+                log.warning("Token refresh failed, retrying: %s", error)
+                retryIn = 10
+
+
+def resolve_token(bearer_token: str | TokenProvider) -> str:
+    """Current token string from either a plain token or a provider"""
+    if isinstance(bearer_token, TokenProvider):
+        return bearer_token.token
+    return bearer_token
+
+
+def send_authorized(
+    send: Callable[[str], requests.Response], bearer_token: str | TokenProvider
+) -> requests.Response:
+    """Send a request, refreshing the token once on 401
+
+    Args:
+        send (Callable[[str], requests.Response]): Sends the request with the given token
+        bearer_token (str | TokenProvider): Plain token, or a provider that can refresh it
+
+    Returns:
+        requests.Response: Response of the last attempt
+    """
+    token = resolve_token(bearer_token)
+    res = send(token)
+    if res.status_code == 401 and isinstance(bearer_token, TokenProvider):
+        res = send(bearer_token.refresh(stale=token))
+    return res
@@ -0,0 +1,657 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime as dt, timedelta
+from pathlib import Path
+from time import time
+
+import pandas as pd
+import requests
+from aiohttp import ClientResponseError
+from requests.exceptions import HTTPError
+
+from helper.api.asyncfunc import AsyncClient, DEFAULT_CONCURRENCY
+from helper.api.getlist import ElementOfTenant
+from helper.api.ratelimit import RateLimiter, limiter
+from helper.api.session import configure_pool, get_session
+from helper.api.tokenprovider import TokenProvider
+from helper.cache import InterfaceCache, MetricCache
+from helper.journal import RunJournal, get_journal_path
+from helper.metricstore import MetricStore
+from helper.plotting import render_canvas
+from helper.reportfile import report_path
+from helper.resultsink import ResultSink
+from helper.runstats import RunStats
+from helper.processing import (
+    DEFAULT_PORT_FIELDS,
+    DEFAULT_PORTS,
+    ElementRecord,
+    aggregate_rows,
+    average_per_site,
+    element_records,
+    port_columns,
+    report_columns,
+    rule_index_from_config,
+    site_list_frame,
+    split_metrics_by_element,
+)
+
+DEFAULT_WORKERS = 4
+REPORT_FILE_NAME = "site_list_with_resource_metric.xlsx"
+DATAPOINTS_FILE_NAME = "resource_metric_datapoints.csv"
+FILTERED_METRIC = "filteredInterfaceBandwidthUsage"
+
+
+def print_log(log: str) -> None:
+    """Print a log line in the format of the GUI log terminal"""
+    print(f"[ {dt.now():%d-%m-%Y %H:%M:%S} ] {log}", flush=True)
+
+
+def check_config(bulkConfig: dict) -> None:
+    """Reject a `bulk` config section `BulkEngine` could not be built from
+
+    Lets a caller report a bad config before logging in or starting a run.
+
+    Args:
+        bulkConfig (dict): The `bulk` config section
+
+    Raises:
+        ValueError: Invalid interface filter rules or port columns
+    """
+    rule_index_from_config(bulkConfig=bulkConfig)
+    port_columns(
+        ports=bulkConfig.get("report_ports", DEFAULT_PORTS),
+        fields=bulkConfig.get("report_port_fields", DEFAULT_PORT_FIELDS),
+    )
+
+
+async def drain(
+    work: queue.Queue, handle: Callable[[object], Awaitable[None]], slots: int = 1
+) -> None:
+    """Pull items off a shared, pre-filled queue until it is empty
+
+    Every worker thread runs this on its own event loop, so a worker that is
+    done early takes the next item instead of idling while another one is
+    stuck behind slow elements.
+
+    Args:
+        work (queue.Queue): Items to process, filled before the workers start
+        handle (Callable[[object], Awaitable[None]]): Coroutine run per item
+        slots (int, optional): Items in flight per worker. Defaults to 1.
+    """
+
+    async def puller() -> None:
+        while True:
+            try:
+                item = work.get_nowait()
+            except queue.Empty:
+                return
+            await handle(item)
+
+    await asyncio.gather(*(puller() for _ in range(max(slots, 1))))
+
+
+class BulkEngine:
+    """Bulk resource metric report for every element of a tenant
+
+    Runs the whole pipeline of the Bulk Metric Reporting page (interfaces,
+    `sys_metrics`, per site averages, plots and the Excel export) without
+    any UI, so it can be driven by the GUI, the CLI or a scheduler alike.
+    Progress goes through `log`; each finished site row is handed to
+    `on_result` as soon as it is ready.
+
+    By default the engine goes through the process wide `limiter` and
+    `get_session()`, like every other API call of the app, and configures
+    them from `bulk.rate_limit` and the worker count. Engines of different
+    tenants get their own limiter and session passed in, so they can run
+    side by side without sharing one budget. `tag` keeps their journals
+    apart.
+    """
+
+    def __init__(
+        self,
+        token_provider: TokenProvider,
+        start: dt,
+        end: dt,
+        dest_dir: str | Path = ".",
+        config: dict | None = None,
+        workers: int | None = None,
+        generate_plots: bool = False,
+        refresh_cache: bool = False,
+        resume: bool = False,
+        log: Callable[[str], None] = print_log,
+        on_result: Callable[[dict], None] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        session: requests.Session | None = None,
+        tag: str = "bulk",
+    ) -> None:
+        self.tokenProvider = token_provider
+        self.start = start
+        self.end = end
+        self.destDirectory = str(dest_dir)
+        self.bulkConfig: dict = config or {}
+        self.workers = max(
+            int(workers or self.bulkConfig.get("workers", DEFAULT_WORKERS)), 1
+        )
+        self.generatePlots = generate_plots
+        self.refreshCache = refresh_cache
+        self.resume = resume
+        self.log = log
+        self.onResult = on_result
+        self.tag = tag
+        # Only the process wide limiter and pool are configured by the run
+        self.sharedLimiter = rate_limiter is None
+        self.sharedSession = session is None
+        self.limiter = limiter if rate_limiter is None else rate_limiter
+        self.session = get_session() if session is None else session
+        self.interfaceCache: InterfaceCache | None = None
+        self.metricCache: MetricCache | None = None
+        self.journal: RunJournal | None = None
+        self.plotPool: ProcessPoolExecutor | None = None
+        self.stats = RunStats()
+        self.summaryPath: Path | None = None
+        self.sink = ResultSink()
+        self.store = MetricStore()
+        self.interfaceRules = rule_index_from_config(bulkConfig=self.bulkConfig)
+        self.siteRules: dict[str, int] = {}
+        self.portColumns = port_columns(
+            ports=self.bulkConfig.get("report_ports", DEFAULT_PORTS),
+            fields=self.bulkConfig.get("report_port_fields", DEFAULT_PORT_FIELDS),
+        )
+        self.metrics: list[dict[str, str | list[str]]] = [
+            {"name": "CPUUsage", "statistics": ["average"], "unit": "percentage"},
+            {"name": "MemoryUsage", "statistics": ["average"], "unit": "percentage"},
+            {"name": "DiskUsage", "statistics": ["average"], "unit": "percentage"},
+            {
+                "name": "InterfaceBandwidthUsage",
+                "statistics": ["average"],
+                "unit": "Mbps",
+            },
+        ]
+
+    def fetch_site_list(self) -> pd.DataFrame:
+        res = ElementOfTenant(
+            bearer_token=self.tokenProvider.token, session=self.session
+        ).request()
+        siteList = site_list_frame(data=res)
+        self.log(f"number of sites: {len(siteList)}")
+        return siteList
+
+    def run(self, siteList: pd.DataFrame) -> ResultSink:
+        """Process every element of `siteList` and block until all are done
+
+        Every finished element is journaled; with `resume`, elements already
+        in the journal of the same window are taken from it instead of being
+        fetched again.
+
+        Args:
+            siteList (pd.DataFrame): Element inventory, see `site_list_frame`
+
+        Returns:
+            ResultSink: One row per element with the averaged metrics
+        """
+        self.sink = ResultSink()
+        self.store = MetricStore()
+        if len(siteList) == 0:
+            return self.sink
+        self.journal = RunJournal(
+            path=get_journal_path(start=self.start, end=self.end, tag=self.tag),
+            resume=self.resume,
+        )
+        siteIds = set(siteList["id"])
+        done = [result for result in self.journal.done if result.get("id") in siteIds]
+        if done:
+            self.log(f"Resuming: {len(done)} of {len(siteList)} elements already done")
+        for result in done:
+            self.emit(result=result, journal=False)
+        siteList = siteList[~siteList["id"].isin({result["id"] for result in done})]
+        self.stats = RunStats(total=len(siteList))
+        # Filter rule of every element, matched once over the whole list
+        self.siteRules = dict(
+            zip(
+                siteList["id"].tolist(),
+                self.interfaceRules.rules_for(siteList["name"]).tolist(),
+            )
+        )
+        if len(siteList) == 0:
+            self.journal.close()
+            return self.sink
+        batchSize: int = max(int(self.bulkConfig.get("batch_size", 10)), 1)
+        # Workers get (row label, record) pairs instead of frame slices
+        elements = list(zip(siteList.index.tolist(), element_records(siteList)))
+        work: queue.Queue[list[tuple[int, ElementRecord]]] = queue.Queue()
+        for start in range(0, len(elements), batchSize):
+            work.put(elements[start : start + batchSize])
+        threadCount: int = min(self.workers, work.qsize())
+        if self.sharedSession:
+            configure_pool(pool_size=threadCount)
+        if self.sharedLimiter:
+            self.limiter.configure(max_rate=self.bulkConfig.get("rate_limit", 10.0))
+        self.interfaceCache = InterfaceCache(
+            ttl=self.bulkConfig.get("interface_cache_ttl_hours", 24.0) * 60 * 60,
+            max_entries=self.bulkConfig.get("interface_cache_max_entries", 50000),
+        )
+        self.metricCache = MetricCache(
+            compact=self.bulkConfig.get("fast_decode", False)
+        )
+        if self.generatePlots:
+            # Spawned, not forked: forking would copy locks held by the token
+            # refresh thread, the workers and the SQLite connections
+            self.plotPool = ProcessPoolExecutor(
+                max_workers=self.bulkConfig.get("plot_workers") or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        try:
+            workingThreads = [
+                threading.Thread(target=asyncio.run, args=(self.iterate_site(work),))
+                for _ in range(threadCount)
+            ]
+            for worker in workingThreads:
+                worker.start()
+            for worker in workingThreads:
+                worker.join()
+        finally:
+            if self.plotPool is not None:
+                self.plotPool.shutdown(wait=True)
+                self.plotPool = None
+            self.interfaceCache.close()
+            self.metricCache.close()
+            self.journal.close()
+            self.summaryPath = self.stats.write(
+                path=Path(self.destDirectory)
+                / f"{dt.now():%Y%m%d_%H%M%S}-bulk_run_summary.json"
+            )
+            self.log(f"Run summary: {self.summaryPath}")
+        return self.sink
+
+    def export(self, file_name: str = REPORT_FILE_NAME) -> Path:
+        """Write the collected rows into `dest_dir` with a timestamped file name
+
+        Returns:
+            Path: The saved file
+        """
+        path = report_path(fileName=file_name, dirStr=self.destDirectory)
+        self.sink.export(
+            path=path,
+            columns=report_columns(
+                metrics=[metric["name"] for metric in self.metrics] + [FILTERED_METRIC],
+                thresholds=self.bulkConfig.get("thresholds"),
+                ports=self.portColumns,
+            ),
+        )
+        return path
+
+    def export_datapoints(self, file_name: str = DATAPOINTS_FILE_NAME) -> Path:
+        """Write the daily datapoints fetched by this run as one long CSV table
+
+        Elements taken from the journal on resume have no datapoints here.
+
+        Returns:
+            Path: The saved file
+        """
+        path = Path(self.destDirectory) / f"{dt.now():%Y%m%d_%H%M%S}-{file_name}"
+        rowCount = self.store.to_csv(path=path)
+        self.log(f"Datapoints exported: {rowCount} rows to {path}")
+        return path
+
+    def submit_plots(self, site: str, element_id: str) -> None:
+        # Plots render in worker processes; the fetch loop only pays for
+        # pickling the stored arrays.
+        future = self.plotPool.submit(
+            render_canvas, site, self.store.series(element_id), self.destDirectory
+        )
+        future.add_done_callback(self.plots_done)
+
+    def plots_done(self, future: Future) -> None:
+        try:
+            errors = future.result()
+        except Exception as error:
+            errors = [f"Plot worker failed: {str(error)}"]
+        for error in errors:
+            self.log(error)
+
+    def emit(self, result: dict, journal: bool = True) -> None:
+        if journal:
+            self.journal.append(result=result)
+        self.sink.append(row=result)
+        if self.onResult is not None:
+            self.onResult(result)
+
+    async def iterate_site(self, work: queue.Queue) -> None:
+        concurrency: int = self.bulkConfig.get("concurrency", DEFAULT_CONCURRENCY)
+        batchSize: int = max(int(self.bulkConfig.get("batch_size", 10)), 1)
+        async with AsyncClient(
+            concurrency=concurrency,
+            rate_limiter=self.limiter,
+            fast_decode=self.bulkConfig.get("fast_decode", False),
+            stats=self.stats,
+        ) as client:
+            # Enough batches in flight to keep the client's request slots busy
+            await drain(
+                work=work,
+                handle=lambda batch: self.process_batch(client=client, batch=batch),
+                slots=-(-concurrency // batchSize),
+            )
+
+    async def process_batch(
+        self, client: AsyncClient, batch: list[tuple[int, ElementRecord]]
+    ) -> None:
+        prefetched: dict[str, list[dict]] = {}
+        rows = [row for _, row in batch]
+        if len(rows) > 1:
+            try:
+                prefetched = await self.fetch_metrics(
+                    client=client,
+                    site_ids=[row.site_id for row in rows],
+                    element_ids=[row.id for row in rows],
+                )
+            except Exception as error:
+                self.log(
+                    f"Batched sys_metrics failed, fetching per element\nERROR: {str(error)}"
+                )
+        rawData = await asyncio.gather(
+            *(
+                self.process_site(
+                    client=client,
+                    index=index,
+                    row=row,
+                    metrics=prefetched.get(row["id"]) or None,
+                )
+                for index, row in batch
+            )
+        )
+        self.emit_batch(rows=rows, rawData=rawData)
+
+    def emit_batch(self, rows: list[ElementRecord], rawData: list[dict | None]) -> None:
+        """Aggregate the fetched elements of a batch together and emit all rows
+
+        Args:
+            rows (list[ElementRecord]): Inventory rows of the batch
+            rawData (list[dict | None]): `generate_data` result per row, None
+                for elements that failed
+        """
+        thresholds: dict[str, float] | None = self.bulkConfig.get("thresholds")
+        fetched = [index for index, data in enumerate(rawData) if data is not None]
+        results: dict[int, dict] = {}
+        with self.stats.stage("aggregate"):
+            try:
+                results = dict(
+                    zip(
+                        fetched,
+                        aggregate_rows(
+                            tenants=[rows[index] for index in fetched],
+                            rawData=[rawData[index] for index in fetched],
+                            thresholds=thresholds,
+                            store=self.store,
+                            ports=self.portColumns,
+                        ),
+                    )
+                )
+            except Exception:
+                # A malformed response only fails its own element
+                for index in fetched:
+                    try:
+                        results[index] = average_per_site(
+                            tenant=rows[index],
+                            rawData=rawData[index],
+                            thresholds=thresholds,
+                            ports=self.portColumns,
+                        ).to_dict()
+                    except Exception as error:
+                        self.log(
+                            f"Error while aggregating: {rows[index]['name']}\nERROR: {str(error)}"
+                        )
+        for index, row in enumerate(rows):
+            result = results.get(index)
+            self.stats.element_done(failed=result is None)
+            if result is None:
+                result = row.to_dict()
+                for each in self.metrics:
+                    result[each["name"]] = None
+            # Failed elements stay out of the journal and are retried on resume
+            self.emit(result=result, journal=index in results)
+
+    async def process_site(
+        self,
+        client: AsyncClient,
+        index,
+        row: ElementRecord,
+        metrics: list[dict] | None = None,
+    ) -> dict | None:
+        """Fetch everything one element's report row needs
+
+        Returns:
+            dict | None: `generate_data` result, None if the element failed
+        """
+        start_time = time()
+        self.log(f"Working for  : {index} - {row['name']}")
+        try:
+            with self.stats.stage("element"):
+                rawData = await self.generate_data(
+                    client=client, tenant=row, metrics=metrics
+                )
+            # Parsed once here; aggregation, plots and export read the store
+            with self.stats.stage("store"):
+                self.store.add(element_id=row["id"], metrics=rawData["data"]["metrics"])
+            if self.plotPool is not None:
+                with self.stats.stage("plot_submit"):
+                    self.submit_plots(site=row["name"], element_id=row["id"])
+            self.log(
+                f"Finished in {time() - start_time:.2f} seconds : {index} - {row['name']}"
+            )
+            return rawData
+        except (HTTPError, ClientResponseError) as reqError:
+            self.log(
+                f"HTTP Error in {time() - start_time:.2f} seconds : {index} - {row['name']}\nERROR: {str(reqError)}"
+            )
+        except Exception as error:
+            self.log(
+                f"Error in {time() - start_time:.2f} seconds while processing: {index} - {row['name']}\nERROR: {str(error)}"
+            )
+        return None
+
+    def window_days(self) -> list[str]:
+        return [
+            (self.start + timedelta(days=day)).date().isoformat()
+            for day in range((self.end - self.start).days + 1)
+        ]
+
+    def metric_payload(
+        self,
+        site_ids: list[str],
+        element_ids: list[str],
+        view: dict | None = None,
+        start: dt | None = None,
+    ) -> dict:
+        payload = {
+            "start_time": (start or self.start).isoformat() + ".000Z",
+            "end_time": self.end.isoformat() + ".000Z",
+            "interval": "1day",
+            "metrics": self.metrics,
+            "filter": {"site": site_ids, "element": element_ids},
+        }
+        if view is not None:
+            payload["view"] = view
+        return payload
+
+    def missing_from(self, element_ids: list[str], keys: list[str]) -> str | None:
+        days = self.window_days()
+        if self.refreshCache:
+            return days[0] if days else None
+        return min(
+            (
+                day
+                for day in (
+                    self.metricCache.first_missing_day(
+                        element_id=element_id, keys=keys, days=days
+                    )
+                    for element_id in element_ids
+                )
+                if day is not None
+            ),
+            default=None,
+        )
+
+    async def fetch_metrics(
+        self, client: AsyncClient, site_ids: list[str], element_ids: list[str]
+    ) -> dict[str, list[dict]]:
+        with self.stats.stage("metrics"):
+            return await self._fetch_metrics(
+                client=client, site_ids=site_ids, element_ids=element_ids
+            )
+
+    async def _fetch_metrics(
+        self, client: AsyncClient, site_ids: list[str], element_ids: list[str]
+    ) -> dict[str, list[dict]]:
+        days = self.window_days()
+        keys = [metric["name"] for metric in self.metrics]
+        fromDay = self.missing_from(element_ids=element_ids, keys=keys)
+        fetched: dict[str, list[dict]] = {}
+        isBatch = len(element_ids) > 1
+        if fromDay is not None:
+            rawData = await client.system_metric(
+                bearer_token=self.tokenProvider,
+                body=self.metric_payload(
+                    site_ids=site_ids,
+                    element_ids=element_ids,
+                    view={"individual": "element"} if isBatch else None,
+                    start=dt.fromisoformat(fromDay),
+                ),
+            )
+            fetched = (
+                split_metrics_by_element(rawData=rawData, element_ids=element_ids)
+                if isBatch
+                else {element_ids[0]: rawData["data"]["metrics"]}
+            )
+        res: dict[str, list[dict]] = {}
+        for element_id in element_ids:
+            if isBatch and fromDay is not None and not fetched.get(element_id):
+                # Cached days alone would be a partial window; an empty
+                # result makes the caller fetch the element on its own
+                res[element_id] = []
+                continue
+            series = {
+                metric["series"][0]["name"]: metric["series"][0]
+                for metric in fetched.get(element_id, [])
+            }
+            res[element_id] = []
+            for key in dict.fromkeys(keys + list(series)):
+                merged = self.metricCache.merge(
+                    element_id=element_id, key=key, series=series.get(key), days=days
+                )
+                if merged is not None:
+                    res[element_id].append({"series": [merged]})
+        return res
+
+    async def get_interfaces(
+        self, client: AsyncClient, tenant: ElementRecord | dict
+    ) -> list[dict]:
+        interfaces: list[dict] | None = (
+            None
+            if self.refreshCache
+            else self.interfaceCache.get(
+                site_id=tenant["site_id"], element_id=tenant["id"]
+            )
+        )
+        if interfaces is None:
+            interfacesRes = await client.get_all_interfaces(
+                bearer_token=self.tokenProvider,
+                site_id=tenant["site_id"],
+                element_id=tenant["id"],
+            )
+            interfaces = interfacesRes["data"]["items"]
+            self.interfaceCache.put(
+                site_id=tenant["site_id"], element_id=tenant["id"], items=interfaces
+            )
+        return interfaces
+
+    async def filtered_interface_usage(
+        self, client: AsyncClient, tenant: ElementRecord | dict, interfaces: list[dict]
+    ) -> dict | None:
+        rule = self.siteRules.get(tenant["id"])
+        filtered_interfaces: list[str] = self.interfaceRules.select(
+            interfaces=interfaces,
+            rule=(
+                self.interfaceRules.rule_for(tenant["name"]) if rule is None else rule
+            ),
+        )
+        if len(filtered_interfaces) == 0:
+            return None
+        key = f"{FILTERED_METRIC}:{','.join(sorted(filtered_interfaces))}"
+        fromDay = self.missing_from(element_ids=[tenant["id"]], keys=[key])
+        filtered_res: dict[str, str | dict] | None = None
+        if fromDay is not None:
+            interfaces_payload = self.metric_payload(
+                site_ids=[tenant["site_id"]],
+                element_ids=[tenant["id"]],
+                view={"individual": "interface", "summary": True},
+                start=dt.fromisoformat(fromDay),
+            )
+            interfaces_payload["metrics"] = self.metrics[-1:]
+            interfaces_payload["filter"]["interface"] = filtered_interfaces
+            interfaceRes = await client.system_metric(
+                bearer_token=self.tokenProvider,
+                body=interfaces_payload,
+                kind="sys_metrics_filtered",
+            )
+            filtered_res = next(
+                (
+                    s
+                    for metric in interfaceRes.get("data", {}).get("metrics", [])
+                    for s in metric.get("series", [])
+                    if s.get("view") == "summary"
+                ),
+                None,
+            )
+            if filtered_res is None:
+                # No usage for the filtered interfaces; cached days alone
+                # would be a partial window
+                return None
+            filtered_res["name"] = FILTERED_METRIC
+        return self.metricCache.merge(
+            element_id=tenant["id"],
+            key=key,
+            series=filtered_res,
+            days=self.window_days(),
+        )
+
+    async def generate_data(
+        self,
+        client: AsyncClient,
+        tenant: ElementRecord | dict,
+        metrics: list[dict] | None = None,
+    ) -> dict:
+        # Only the filtered interface query needs the interface list; the
+        # element metrics are fetched alongside both.
+        async def interface_part() -> tuple[list[dict], dict | None]:
+            with self.stats.stage("interfaces"):
+                interfaces = await self.get_interfaces(client=client, tenant=tenant)
+            with self.stats.stage("filtered_interfaces"):
+                return interfaces, await self.filtered_interface_usage(
+                    client=client, tenant=tenant, interfaces=interfaces
+                )
+
+        async def metric_part() -> list[dict]:
+            if metrics is not None:
+                return metrics
+            return (
+                await self.fetch_metrics(
+                    client=client,
+                    site_ids=[tenant["site_id"]],
+                    element_ids=[tenant["id"]],
+                )
+            )[tenant["id"]]
+
+        (interfaces, filtered_res), elementMetrics = await asyncio.gather(
+            interface_part(), metric_part()
+        )
+        res = {"status": 200, "data": {"metrics": list(elementMetrics)}}
+        if filtered_res is not None:
+            res["data"]["metrics"].append({"series": [filtered_res]})
+        res["data"]["interfaces"] = interfaces
+
+        return res
@@ -0,0 +1,385 @@
+"""Persistent caches for API data that rarely changes between runs.
+
+Everything lives in one SQLite file under the per-user cache directory, so a
+repeat bulk run can skip requests whose answer it already has. Connections are
+shared between worker threads behind a lock.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from time import time
+import json
+import sqlite3
+import threading
+
+import numpy as np
+from platformdirs import user_cache_dir
+
+from helper.api.decode import Datapoints
+
+
+def get_cache_path() -> Path:
+    """Return absolute path to the PANBA cache database, creating its folder.
+
+    Returns
+    -------
+    Path
+        The path to the SQLite cache file.
+    """
+
+    cache_dir: str = user_cache_dir(appname="PANBA", appauthor="NTTIndonesia")
+    path: Path = Path(cache_dir).expanduser().absolute()
+    path.mkdir(parents=True, exist_ok=True)
+    return path / "cache.sqlite3"
+
+
+class _SQLiteStore:
+    """One locked SQLite connection to the cache file."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path: Path = path or get_cache_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class InterfaceCache(_SQLiteStore):
+    """Interface lists per element with a TTL and a size bound.
+
+    Parameters
+    ----------
+    path : Path | None
+        Optional override path; defaults to :func:`get_cache_path`.
+    ttl : float
+        Seconds an entry stays valid after it was fetched.
+    max_entries : int
+        Number of elements kept; least recently used entries go first.
+    """
+
+    _EVICT_EVERY = 100
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        ttl: float = 24 * 60 * 60,
+        max_entries: int = 50_000,
+    ) -> None:
+        super().__init__(path=path)
+        self.ttl = ttl
+        self.maxEntries = max_entries
+        self._puts = 0
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS interfaces (
+                site_id TEXT NOT NULL,
+                element_id TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                items TEXT NOT NULL,
+                PRIMARY KEY (site_id, element_id)
+            )
+            """)
+        self.evict()
+
+    def get(self, site_id: str, element_id: str) -> list[dict] | None:
+        """Return the cached interface items, or None if missing or expired."""
+
+        now = time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, items FROM interfaces"
+                " WHERE site_id = ? AND element_id = ?",
+                (str(site_id), str(element_id)),
+            ).fetchone()
+            if row is None or row[0] + self.ttl < now:
+                return None
+            self._conn.execute(
+                "UPDATE interfaces SET accessed_at = ?"
+                " WHERE site_id = ? AND element_id = ?",
+                (now, str(site_id), str(element_id)),
+            )
+        return json.loads(row[1])
+
+    def put(self, site_id: str, element_id: str, items: list[dict]) -> None:
+        """Store the interface items of one element."""
+
+        now = time()
+        payload = json.dumps(items, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO interfaces VALUES (?, ?, ?, ?, ?)",
+                (str(site_id), str(element_id), now, now, payload),
+            )
+            self._puts += 1
+            due = self._puts % self._EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove expired entries and trim to ``max_entries``."""
+
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM interfaces WHERE fetched_at < ?", (time() - self.ttl,)
+            )
+            self._conn.execute(
+                "DELETE FROM interfaces WHERE rowid IN ("
+                " SELECT rowid FROM interfaces ORDER BY accessed_at DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.maxEntries,),
+            )
+
+
+def _merge_compact(
+    fetched: Datapoints | None, cached: list[tuple[str, float | None]]
+) -> Datapoints:
+    """Merge cached ``(time, value)`` rows into fetched datapoints.
+
+    Works on the arrays directly, keyed on the day of each timestamp; a
+    fetched day wins over the cached one.
+
+    Parameters
+    ----------
+    fetched : Datapoints | None
+        Freshly decoded datapoints, None if nothing was fetched.
+    cached : list[tuple[str, float | None]]
+        Rows read from the cache for the report window.
+
+    Returns
+    -------
+    Datapoints
+        All datapoints of the window in time order.
+    """
+
+    times = np.array([row[0].rstrip("Z") for row in cached], dtype="datetime64[ms]")
+    # None becomes NaN under a float dtype
+    values = np.array([row[1] for row in cached], dtype=np.float64)
+    if fetched is not None:
+        keep = ~np.isin(
+            times.astype("datetime64[D]"), fetched.times.astype("datetime64[D]")
+        )
+        times = np.concatenate([times[keep], fetched.times])
+        values = np.concatenate([values[keep], fetched.values])
+    order = np.argsort(times, kind="stable")
+    return Datapoints(times=times[order], values=values[order])
+
+
+class MetricCache(_SQLiteStore):
+    """Daily datapoints per element and metric series.
+
+    Past days of a ``1day`` series do not change, so a report window that
+    overlaps an earlier run only has to fetch the days it does not have yet.
+    A day is stored once it ended at least ``settle`` seconds ago, which
+    keeps late-arriving data of the current day out of the cache.
+
+    Parameters
+    ----------
+    path : Path | None
+        Optional override path; defaults to :func:`get_cache_path`.
+    settle : float
+        Seconds after the end of a day before its datapoint is cached.
+    retention_days : int
+        Days older than this are dropped when the cache is opened.
+    compact : bool
+        Return series served purely from cache with compact ``Datapoints``,
+        matching what the fast decoder yields for fetched ones.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        settle: float = 6 * 60 * 60,
+        retention_days: int = 120,
+        compact: bool = False,
+    ) -> None:
+        super().__init__(path=path)
+        self.settle = settle
+        self.compact = compact
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS datapoints (
+                element_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                day TEXT NOT NULL,
+                time TEXT NOT NULL,
+                value REAL,
+                PRIMARY KEY (element_id, key, day)
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS series (
+                element_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                name TEXT NOT NULL,
+                unit TEXT,
+                PRIMARY KEY (element_id, key)
+            )
+            """)
+        cutoff = date.today() - timedelta(days=retention_days)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM datapoints WHERE day < ?", (cutoff.isoformat(),)
+            )
+
+    def first_missing_day(
+        self, element_id: str, keys: list[str], days: list[str]
+    ) -> str | None:
+        """Return the earliest day of ``days`` missing for any key.
+
+        Parameters
+        ----------
+        element_id : str
+            Element to look up.
+        keys : list[str]
+            Series keys that must all be present.
+        days : list[str]
+            ISO dates of the report window, ascending.
+
+        Returns
+        -------
+        str | None
+            The first day that must be fetched, None if everything is cached.
+        """
+
+        if not days:
+            return None
+        missing: list[str] = []
+        with self._lock:
+            for key in keys:
+                cached = self._cached_days(element_id=element_id, key=key, days=days)
+                day = next((day for day in days if day not in cached), None)
+                if day is not None:
+                    missing.append(day)
+        return min(missing, default=None)
+
+    def _cached_days(self, element_id: str, key: str, days: list[str]) -> set[str]:
+        return {
+            row[0]
+            for row in self._conn.execute(
+                "SELECT day FROM datapoints"
+                " WHERE element_id = ? AND key = ? AND day BETWEEN ? AND ?",
+                (str(element_id), key, days[0], days[-1]),
+            )
+        }
+
+    def _settled_before(self) -> str:
+        # A day is settled once its end in UTC lies ``settle`` seconds back,
+        # i.e. every ISO day below the returned one
+        return (
+            (datetime.now(timezone.utc) - timedelta(seconds=self.settle))
+            .date()
+            .isoformat()
+        )
+
+    def merge(
+        self, element_id: str, key: str, series: dict | None, days: list[str]
+    ) -> dict | None:
+        """Store a freshly fetched series and complete it from the cache.
+
+        Datapoints of settled days in ``series`` are written to the cache.
+        Window days the fetch did not cover are filled in from earlier runs,
+        so the result looks like a series fetched for the whole window.
+
+        Parameters
+        ----------
+        element_id : str
+            Element the series belongs to.
+        key : str
+            Cache key of the series, usually the metric name.
+        series : dict | None
+            Series as returned by ``sys_metrics``; None if nothing was fetched.
+        days : list[str]
+            ISO dates of the report window, ascending.
+
+        Returns
+        -------
+        dict | None
+            The completed series, None if neither fetch nor cache had it.
+        """
+
+        element_id = str(element_id)
+        fetched: list[dict] | Datapoints = (
+            series["data"][0]["datapoints"] if series else []
+        )
+        settledBefore = self._settled_before()
+        if isinstance(fetched, Datapoints):
+            fetchedDays = fetched.times.astype("datetime64[D]")
+            settled = fetchedDays < np.datetime64(settledBefore)
+            rows = list(
+                zip(
+                    np.datetime_as_string(fetchedDays[settled]).tolist(),
+                    [
+                        f"{stamp}Z"
+                        for stamp in np.datetime_as_string(
+                            fetched.times[settled], unit="ms"
+                        )
+                    ],
+                    [
+                        None if np.isnan(value) else value
+                        for value in fetched.values[settled].tolist()
+                    ],
+                )
+            )
+        else:
+            fetchedDays = {point["time"][:10] for point in fetched}
+            rows = [
+                (point["time"][:10], point["time"], point["value"])
+                for point in fetched
+                if point["time"][:10] < settledBefore
+            ]
+        with self._lock:
+            if series is not None:
+                # One transaction per series instead of one per datapoint
+                self._conn.execute("BEGIN")
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?)",
+                        (element_id, key, series["name"], series.get("unit")),
+                    )
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO datapoints VALUES (?, ?, ?, ?, ?)",
+                        [(element_id, key, *row) for row in rows],
+                    )
+                meta = (series["name"], series.get("unit"))
+            else:
+                meta = self._conn.execute(
+                    "SELECT name, unit FROM series WHERE element_id = ? AND key = ?",
+                    (element_id, key),
+                ).fetchone()
+                if meta is None:
+                    return None
+            cached: list[tuple[str, float | None]] = (
+                []
+                if not days
+                else self._conn.execute(
+                    "SELECT time, value FROM datapoints"
+                    " WHERE element_id = ? AND key = ? AND day BETWEEN ? AND ?",
+                    (element_id, key, days[0], days[-1]),
+                ).fetchall()
+            )
+        if isinstance(fetched, Datapoints) or (series is None and self.compact):
+            datapoints = _merge_compact(
+                fetched=fetched if isinstance(fetched, Datapoints) else None,
+                cached=cached,
+            )
+        else:
+            datapoints = sorted(
+                [
+                    {"time": row[0], "value": row[1]}
+                    for row in cached
+                    if row[0][:10] not in fetchedDays
+                ]
+                + list(fetched),
+                key=lambda point: point["time"],
+            )
+        merged = dict(series) if series is not None else {}
+        merged.update(
+            {"name": meta[0], "unit": meta[1], "data": [{"datapoints": datapoints}]}
+        )
+        return merged
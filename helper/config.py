@@ -16,7 +16,7 @@ from __future__ import annotations
 
 from base64 import b64decode, b64encode
 from pathlib import Path
-from typing import Any, Dict, TypedDict, cast
+from typing import Any, Dict, List, TypedDict, cast
 import json
 import logging
 import os
@@ -88,6 +88,55 @@ class Auth(TypedDict, total=False):
     secret_enc: str
 
 
+class Bulk(TypedDict, total=False):
+    """Tuning knobs for the bulk metric pipeline.
+
+    Attributes
+    ----------
+    workers: int
+        Worker threads pulling element batches off the shared queue.
+    concurrency: int
+        Upper bound of API requests kept in flight by one async client.
+    batch_size: int
+        Elements requested per batched `sys_metrics` call; 1 disables batching.
+    rate_limit: float
+        Ceiling of API requests per second shared by all workers.
+    interface_cache_ttl_hours: float
+        How long a cached element interface list stays valid.
+    interface_cache_max_entries: int
+        Number of elements kept in the interface cache.
+    fast_decode: bool
+        Decode monitor responses into compact arrays of the used fields only.
+    plot_workers: int
+        Processes rendering plots; 0 uses one per CPU.
+    thresholds: dict[str, float]
+        Per metric limit; the report counts the days whose value is above.
+    interface_filters: list[list[str]]
+        Pairs of site name and interface name patterns; the first pair whose
+        site pattern matches picks the interfaces of the filtered bandwidth.
+    interface_fallback: str
+        Interface name pattern of sites matching no filter pair.
+    report_ports: list[str]
+        Interface names reported per element, one set of columns each.
+    report_port_fields: list[str]
+        Interface fields reported per port, see `processing.PORT_FIELDS`.
+    """
+
+    workers: int
+    concurrency: int
+    batch_size: int
+    rate_limit: float
+    interface_cache_ttl_hours: float
+    interface_cache_max_entries: int
+    fast_decode: bool
+    plot_workers: int
+    thresholds: Dict[str, float]
+    interface_filters: List[List[str]]
+    interface_fallback: str
+    report_ports: List[str]
+    report_port_fields: List[str]
+
+
 class Config(TypedDict, total=False):
     """Top-level configuration shape.
 
@@ -101,12 +150,15 @@ class Config(TypedDict, total=False):
         Last used directories.
     auth: Auth
         Authentication profile.
+    bulk: Bulk
+        Bulk metric pipeline tuning.
     """
 
     version: str
     ui: UIOverrides
     paths: Paths
     auth: Auth
+    bulk: Bulk
 
 
 def get_config_path() -> Path:
@@ -158,6 +210,28 @@ def default_config() -> Config:
                 "tsg_id": "",
                 # secret_enc intentionally omitted until a value is saved
             },
+            "bulk": {
+                "workers": 4,
+                "concurrency": 16,
+                "batch_size": 10,
+                "rate_limit": 10.0,
+                "interface_cache_ttl_hours": 24.0,
+                "interface_cache_max_entries": 50000,
+                "fast_decode": False,
+                "plot_workers": 0,
+                "thresholds": {
+                    "CPUUsage": 80.0,
+                    "MemoryUsage": 80.0,
+                    "DiskUsage": 80.0,
+                },
+                "interface_filters": [
+                    ["^DC-|^DRC", "^13"],
+                    ["^DCI-", "^13$|^14"],
+                ],
+                "interface_fallback": "^1$",
+                "report_ports": ["1", "2"],
+                "report_port_fields": ["ipv4"],
+            },
         },
     )
 
@@ -181,7 +255,7 @@ def _merge_defaults(cfg: Dict[str, Any]) -> Config:
     for key, value in base.items():
         if key not in cfg:
             cfg[key] = value
-    # Merge nested structures (ui.defaults, paths, auth)
+    # Merge nested structures (ui.defaults, paths, auth, bulk)
     if isinstance(cfg.get("ui"), dict) and isinstance(base.get("ui"), dict):
         ui = cfg["ui"]
         for k, v in base["ui"].items():
@@ -199,6 +273,10 @@ def _merge_defaults(cfg: Dict[str, Any]) -> Config:
         for k, v in base["auth"].items():
             if k not in cfg["auth"]:
                 cfg["auth"][k] = v
+    if isinstance(cfg.get("bulk"), dict):
+        for k, v in base["bulk"].items():
+            if k not in cfg["bulk"]:
+                cfg["bulk"][k] = v
     # Ensure version present
     if not isinstance(cfg.get("version"), str):
         cfg["version"] = base["version"]
@@ -1,9 +1,10 @@
-from datetime import datetime
+from itertools import chain
 from pathlib import Path
-from typing import Union, Dict, Any, List
+from typing import Union, Dict, Any, Iterable, Iterator, List
 import chardet
 import pandas as pd
-from tkinter import filedialog as fd
+
+from helper import reportfile
 
 
 class FileHandler:
@@ -132,6 +133,8 @@ class FileHandler:
         Returns:
             FileHandler: FileHandler Class Object
         """
+        from tkinter import filedialog as fd
+
         destDirectory = fd.askdirectory(
             initialdir=dirStr,
             mustexist=True,
@@ -160,24 +163,25 @@ class FileHandler:
         Returns:
             FileHandler: FileHandler Class Object
         """
-        if timeStamp:
-            fileName = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{fileName}"
+        if not promptDialog:
+            self.savedFile = reportfile.report_path(
+                fileName=fileName, dirStr=dirStr, timeStamp=timeStamp
+            )
+            return self
+        from tkinter import filedialog as fd
+
         filetype = (
             ("Excel Files", "*.xls *.xlsx *.xlsm *.xlsb"),
             ("CSV Files", "*.csv"),
             ("All Files", "*.*"),
         )
-        res = (
-            fd.asksaveasfilename(
-                title="Save File As ...",
-                initialdir=dirStr if dirStr != "" else self.destDir,
-                filetypes=filetype,
-                defaultextension=".xlsx",
-                initialfile=fileName,
-                confirmoverwrite=True,
-            )
-            if promptDialog
-            else f"{dirStr}/{fileName}"
+        res = fd.asksaveasfilename(
+            title="Save File As ...",
+            initialdir=dirStr if dirStr != "" else self.destDir,
+            filetypes=filetype,
+            defaultextension=".xlsx",
+            initialfile=reportfile.stamped(fileName) if timeStamp else fileName,
+            confirmoverwrite=True,
         )
         self.savedFile = Path(res).absolute() if res != "" else self.savedFile
         return self
@@ -188,6 +192,8 @@ class FileHandler:
         Returns:
             FileHandler: FileHandler Class Object
         """
+        from tkinter import filedialog as fd
+
         filetype = (
             ("CSV Files", "*.csv"),
             ("Excel Files", "*.xls *.xlsx *.xlsm *.xlsb"),
@@ -309,6 +315,24 @@ class FileHandler:
         writer.close()
         return self
 
+    def export_excel_chunks(
+        self, chunks: Iterable[pd.DataFrame], sheetName: str = "Sheet1"
+    ) -> int:
+        """Export DataFrame chunks to `savedFile`
+
+        See `helper.reportfile.export_excel_chunks`.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): Consecutive parts of the table
+            sheetName (str, optional): Target sheet name. Defaults to "Sheet1".
+
+        Returns:
+            int: Number of data rows written
+        """
+        return reportfile.export_excel_chunks(
+            path=self.savedFile, chunks=chunks, sheetName=sheetName
+        )
+
     def flatten_dict(
         self, data: dict, parent_key: str = "", sep: str = "_", level: int = 1
     ) -> dict:
@@ -336,6 +360,123 @@ class FileHandler:
                 items.append((new_key, value))
         return dict(items)
 
+    def flatten_items(
+        self, items: List[dict], sep: str = "_", level: Union[int, None] = None
+    ) -> Dict[str, list]:
+        """Flatten a list of nested dictionaries straight into columns
+
+        Same key naming and column order as flattening each item with
+        `flatten_dict` and building a DataFrame from the dicts, but over the
+        whole list at once and without recursion: each key is read from
+        every item with one list comprehension, and a key holding
+        dictionaries is walked the same way through an explicit stack. The
+        column order is then taken from the few items that introduce a new
+        column. An item lacking a key gets None there.
+
+        Args:
+            items (List[dict]): Data with nested dictionaries
+            sep (str, optional): New key separators. Defaults to "_".
+            level (int | None, optional): How many nested shall there be,
+                None for all of them. Defaults to None.
+
+        Returns:
+            Dict[str, list]: Column name to one value per item
+        """
+        columns: Dict[str, list] = {}
+        # Column name -> index of the first item having it
+        firstRows: Dict[str, int] = {}
+        stack = [("", items, level, iter(dict.fromkeys(chain.from_iterable(items))))]
+        while stack:
+            parent, rows, depth, keys = stack[-1]
+            for key in keys:
+                name = f"{parent}{sep}{key}" if parent != "" else key
+                values = [row.get(key) for row in rows]
+                if depth != 0 and any(
+                    issubclass(kind, dict) for kind in set(map(type, values))
+                ):
+                    scalarRows = [
+                        index
+                        for index, row in enumerate(rows)
+                        if key in row and not isinstance(row[key], dict)
+                    ]
+                    if scalarRows:
+                        self._put_column(
+                            columns=columns,
+                            firstRows=firstRows,
+                            name=name,
+                            values=[
+                                None if isinstance(value, dict) else value
+                                for value in values
+                            ],
+                            first=scalarRows[0],
+                        )
+                    nested = [
+                        value if isinstance(value, dict) else {} for value in values
+                    ]
+                    stack.append(
+                        (
+                            name,
+                            nested,
+                            None if depth is None else depth - 1,
+                            iter(dict.fromkeys(chain.from_iterable(nested))),
+                        )
+                    )
+                    break
+                self._put_column(
+                    columns=columns,
+                    firstRows=firstRows,
+                    name=name,
+                    values=values,
+                    first=next(index for index, row in enumerate(rows) if key in row),
+                )
+            else:
+                stack.pop()
+        order: Dict[str, None] = {}
+        for row in sorted(set(firstRows.values())):
+            order.update(
+                dict.fromkeys(self._flat_names(data=items[row], sep=sep, level=level))
+            )
+        return {name: columns[name] for name in order}
+
+    @staticmethod
+    def _put_column(
+        columns: Dict[str, list],
+        firstRows: Dict[str, int],
+        name: str,
+        values: list,
+        first: int,
+    ) -> None:
+        firstRows[name] = min(firstRows.get(name, first), first)
+        # Two paths flattening to one name: the later non-empty value wins
+        column = columns.get(name)
+        if column is None:
+            columns[name] = values
+            return
+        for row, value in enumerate(values):
+            if value is not None:
+                column[row] = value
+
+    @staticmethod
+    def _flat_names(data: dict, sep: str, level: Union[int, None]) -> Iterator[str]:
+        # Flattened key names of one item, in `flatten_dict` order
+        stack = [("", iter(data.items()), level)]
+        while stack:
+            parent, entries, depth = stack[-1]
+            for key, value in entries:
+                name = f"{parent}{sep}{key}" if parent != "" else key
+                if isinstance(value, dict) and depth != 0:
+                    stack.append(
+                        (
+                            name,
+                            iter(value.items()),
+                            None if depth is None else depth - 1,
+                        )
+                    )
+                    break
+                yield name
+            else:
+                stack.pop()
+
     def open_explorer(self) -> "FileHandler":
         """Open File Explorer
 
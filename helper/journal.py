@@ -0,0 +1,92 @@
+"""Checkpoint journal for long bulk runs.
+
+Each element whose metrics were collected is appended as one JSON line and
+synced to disk right away, so a crash, an expired session or a closed window
+only loses the elements still in flight. A resumed run reads the journal back,
+skips those elements and rebuilds the report from it.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+import json
+import os
+import threading
+
+from helper.cache import get_cache_path
+
+
+def get_journal_path(start: datetime, end: datetime, tag: str = "bulk") -> Path:
+    """Return the journal file of a report window, creating its folder.
+
+    Parameters
+    ----------
+    start, end : datetime
+        Report window; a resume only matches a run over the same window.
+    tag : str
+        Prefix separating journals of different reports.
+
+    Returns
+    -------
+    Path
+        Path next to the cache database.
+    """
+
+    folder = get_cache_path().parent / "journal"
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / f"{tag}_{start:%Y%m%d}_{end:%Y%m%d}.jsonl"
+
+
+def _plain(value: Any) -> Any:
+    # numpy scalars carry .item(); anything else is kept as text
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+class RunJournal:
+    """Append-only JSON-lines record of finished elements.
+
+    Parameters
+    ----------
+    path : Path
+        Journal file.
+    resume : bool
+        Keep and read back an existing journal; otherwise start a new one.
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._torn = False
+        self.done: list[dict] = self._read() if resume else []
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if self._torn:
+            self._file.write("\n")
+
+    def _read(self) -> list[dict]:
+        if not self.path.is_file():
+            return []
+        done: list[dict] = []
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                self._torn = not line.endswith("\n")
+                try:
+                    done.append(json.loads(line))
+                except ValueError:
+                    # Torn last line of a run killed mid-write
+                    continue
+        return done
+
+    def append(self, result: dict) -> None:
+        """Write one finished element and sync it to disk."""
+
+        line = json.dumps(result, default=_plain) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
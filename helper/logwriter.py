@@ -1,3 +1,4 @@
+import queue
 import customtkinter
 from pathlib import Path
 from datetime import datetime as dt
@@ -17,7 +18,78 @@ def text_view_render(widget: customtkinter.CTkTextbox, log: str) -> None:
 
 
 def save_log_to_file(widget: customtkinter.CTkTextbox) -> None:
-    logFile = open(Path("./PANBA.log"), "a")
+    logFile = open(Path("./PANBA.log"), "a", encoding="utf-8")
     logFile.write(widget.get("0.0", "end"))
     logFile.write("\n--- Log saved at " + f"{dt.now():%d-%m-%Y %H:%M:%S}" + " ---\n\n")
     logFile.close()
+
+
+class TextLogger:
+    """Thread-safe, batched log rendering into a textbox
+
+    `log` may be called from any thread; it only enqueues the timestamped
+    line. Every `interval` ms the Tk thread drains the queue and renders all
+    pending lines with a single insert, then trims the textbox to its last
+    `max_lines` lines. When streaming is on, every line also goes to a file,
+    so trimming the textbox loses nothing.
+
+    Args:
+        widget (customtkinter.CTkTextbox): Textbox to render into
+        max_lines (int, optional): Lines kept in the textbox. Defaults to 5000.
+        interval (int, optional): Flush period in ms. Defaults to 100.
+    """
+
+    def __init__(
+        self,
+        widget: customtkinter.CTkTextbox,
+        max_lines: int = 5000,
+        interval: int = 100,
+    ) -> None:
+        self.widget = widget
+        self.maxLines = max_lines
+        self.interval = interval
+        self.records: queue.SimpleQueue[str] = queue.SimpleQueue()
+        self.logFile = None
+        self.widget.after(self.interval, self.flush)
+
+    def log(self, log: str) -> None:
+        self.records.put(f"[ {dt.now():%d-%m-%Y %H:%M:%S} ] {log}\n")
+
+    def stream_to(self, path: Path | None) -> None:
+        """Append every rendered line to `path`; None stops streaming"""
+        self.flush(reschedule=False)
+        if self.logFile is not None:
+            self.logFile.close()
+        self.logFile = open(path, "a", encoding="utf-8") if path is not None else None
+
+    def flush(self, reschedule: bool = True) -> None:
+        try:
+            self._render()
+        finally:
+            # A failing write or render must not stop the periodic flush
+            if reschedule:
+                self.widget.after(self.interval, self.flush)
+
+    def _render(self) -> None:
+        lines: list[str] = []
+        try:
+            while True:
+                lines.append(self.records.get_nowait())
+        except queue.Empty:
+            pass
+        if not lines:
+            return
+        if self.logFile is not None:
+            self.logFile.writelines(lines)
+            self.logFile.flush()
+        self.widget.configure(state="normal")
+        try:
+            self.widget.insert(customtkinter.END, "".join(lines[-self.maxLines :]))
+            # Every line ends with "\n", so "end-1c" sits on the empty line
+            # after the last one; keep the `maxLines` lines above it
+            firstKept = int(self.widget.index("end-1c").split(".")[0]) - self.maxLines
+            if firstKept > 1:
+                self.widget.delete("1.0", f"{firstKept}.0")
+        finally:
+            self.widget.configure(state="disabled")
+        self.widget.see(customtkinter.END)
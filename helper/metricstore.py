@@ -0,0 +1,351 @@
+"""In-memory long-format store of metric datapoints.
+
+Every `sys_metrics` series is parsed once, when its response arrives, into an
+int64 array of epoch milliseconds and a float64 array of values, keyed by
+element and metric. Aggregation, plotting and the datapoint export all read
+those arrays (plots get views, not copies); the long table with categorical
+element and metric columns is only materialized on demand.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+import threading
+
+import numpy as np
+import pandas as pd
+
+from helper.api.decode import Datapoints
+
+STATISTICS: tuple[str, ...] = ("mean", "max", "min", "p95", "p99")
+DEFAULT_THRESHOLDS: dict[str, float] = {
+    "CPUUsage": 80.0,
+    "MemoryUsage": 80.0,
+    "DiskUsage": 80.0,
+}
+
+
+class MetricSeries(NamedTuple):
+    """One stored series, as read by plots.
+
+    `times` and `values` are views into the store; they pickle as a single
+    buffer each when sent to a plotting process.
+    """
+
+    name: str
+    unit: str | None
+    times: np.ndarray
+    values: np.ndarray
+
+
+def series_statistics(
+    values: np.ndarray, lengths: np.ndarray, thresholds: np.ndarray
+) -> dict[str, np.ndarray]:
+    """Statistics of many series in one pass over their concatenated values.
+
+    The series are laid out as the rows of one NaN padded matrix and sorted
+    together, so min, max and the percentiles (linear interpolation, as
+    `np.percentile`) are read off each row by position. NaN values are
+    ignored; a series without values gets NaN statistics.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Datapoint values of every series, concatenated.
+    lengths : np.ndarray
+        Number of values of each series.
+    thresholds : np.ndarray
+        Per series threshold; NaN skips the count.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One array per name in `STATISTICS` plus `days_above`, each with one
+        entry per series.
+    """
+
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    matrix = np.full((len(lengths), max(lengths, default=0)), np.nan)
+    matrix[rows, np.arange(len(values)) - starts[rows]] = values
+    # NaN sorts last, so each row starts with its values in order
+    matrix.sort(axis=1)
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    present = counts > 0
+    last = np.maximum(counts - 1, 0)
+
+    def pick(index: np.ndarray) -> np.ndarray:
+        res = np.take_along_axis(matrix, index[:, None], axis=1)[:, 0]
+        return np.where(present, res, np.nan)
+
+    def percentile(q: float) -> np.ndarray:
+        position = last * (q / 100)
+        low = np.floor(position).astype(np.int64)
+        lowValue = pick(low)
+        return lowValue + (pick(np.ceil(position).astype(np.int64)) - lowValue) * (
+            position - low
+        )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(matrix, axis=1) / counts
+        above = np.count_nonzero(matrix > thresholds[:, None], axis=1)
+    return {
+        "mean": mean,
+        "max": pick(last),
+        "min": pick(np.zeros(len(lengths), dtype=np.int64)),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "days_above": np.where(np.isnan(thresholds) | ~present, np.nan, above),
+    }
+
+
+def metric_columns(name: str, thresholds: dict[str, float]) -> list[tuple[str, str]]:
+    """Report columns of one metric, see `MetricStore.aggregate`.
+
+    Parameters
+    ----------
+    name : str
+        Metric name.
+    thresholds : dict[str, float]
+        Metric name to threshold; only listed metrics get `days_above`.
+
+    Returns
+    -------
+    list[tuple[str, str]]
+        ``(statistic, column)`` pairs in report order.
+    """
+
+    return [
+        (stat, name if stat == "mean" else f"{name}_{stat}")
+        for stat in STATISTICS + ("days_above",)
+        if stat != "days_above" or name in thresholds
+    ]
+
+
+class MetricStore:
+    """Thread-safe datapoints of many elements, filled once per response.
+
+    Elements and metrics are interned to integer codes, which become the
+    categories of the long table. Adding a series that is already stored
+    replaces it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.elements: dict[str, int] = {}
+        self.metrics: dict[str, int] = {}
+        self.units: dict[int, str | None] = {}
+        # element code -> metric code -> (epoch ms, values)
+        self._series: dict[int, dict[int, tuple[np.ndarray, np.ndarray]]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(
+                len(values)
+                for metrics in self._series.values()
+                for _, values in metrics.values()
+            )
+
+    def add(self, element_id: str, metrics: list[dict]) -> None:
+        """Store the series of one `sys_metrics` response.
+
+        Parameters
+        ----------
+        element_id : str
+            Element the series belong to.
+        metrics : list[dict]
+            `data.metrics` of the response, raw or compact decoded.
+        """
+
+        parsed: list[tuple[str, str | None, np.ndarray, np.ndarray]] = []
+        for metric in metrics:
+            series = metric["series"][0]
+            datapoints = series["data"][0]["datapoints"]
+            if not isinstance(datapoints, Datapoints):
+                datapoints = Datapoints.from_points(datapoints)
+            parsed.append(
+                (
+                    series["name"],
+                    series.get("unit"),
+                    datapoints.times.astype("datetime64[ms]", copy=False).view(
+                        np.int64
+                    ),
+                    # float64, as the API's decimals do not survive float32
+                    # and the statistics are reported as they are computed
+                    datapoints.values.astype(np.float64, copy=False),
+                )
+            )
+        with self._lock:
+            element = self.elements.setdefault(element_id, len(self.elements))
+            stored = self._series.setdefault(element, {})
+            for name, unit, times, values in parsed:
+                code = self.metrics.setdefault(name, len(self.metrics))
+                self.units.setdefault(code, unit)
+                stored[code] = (times, values)
+
+    def _element_series(
+        self, element_id: str
+    ) -> list[tuple[int, np.ndarray, np.ndarray]]:
+        with self._lock:
+            element = self.elements.get(element_id)
+            if element is None:
+                return []
+            return [
+                (code, times, values)
+                for code, (times, values) in self._series[element].items()
+            ]
+
+    def series(self, element_id: str) -> list[MetricSeries]:
+        """Stored series of one element, in response order."""
+
+        with self._lock:
+            names = list(self.metrics)
+        return [
+            MetricSeries(
+                name=names[code],
+                unit=self.units[code],
+                times=times.view("datetime64[ms]"),
+                values=values,
+            )
+            for code, times, values in self._element_series(element_id)
+        ]
+
+    def aggregate(
+        self, element_ids: list[str], thresholds: dict[str, float] | None = None
+    ) -> dict[str, np.ndarray]:
+        """Metric columns of many elements, see `series_statistics`.
+
+        Per metric there is the mean under the metric name and `<metric>_max`,
+        `_min`, `_p95` and `_p99`; metrics with a threshold also get
+        `<metric>_days_above`, the number of days above it.
+
+        Parameters
+        ----------
+        element_ids : list[str]
+            Elements in report order.
+        thresholds : dict[str, float] | None
+            Metric name to threshold. Defaults to `DEFAULT_THRESHOLDS`.
+
+        Returns
+        -------
+        dict[str, np.ndarray]
+            Column name to one value per element, NaN where an element lacks
+            the metric. Columns follow the first-seen metric order.
+        """
+
+        thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+        with self._lock:
+            names = list(self.metrics)
+        rows: list[int] = []
+        codes: list[int] = []
+        chunks: list[np.ndarray] = []
+        for row, element_id in enumerate(element_ids):
+            for code, _, values in self._element_series(element_id):
+                rows.append(row)
+                codes.append(code)
+                chunks.append(values)
+        statistics = series_statistics(
+            values=np.concatenate(chunks) if chunks else np.empty(0),
+            lengths=np.array([len(chunk) for chunk in chunks], dtype=np.int64),
+            thresholds=np.array(
+                [thresholds.get(names[code], np.nan) for code in codes],
+                dtype=np.float64,
+            ),
+        )
+        rowIndex = np.array(rows, dtype=np.int64)
+        codeIndex = np.array(codes, dtype=np.int64)
+        columns: dict[str, np.ndarray] = {}
+        for code in dict.fromkeys(codes):
+            name = names[code]
+            mask = codeIndex == code
+            for stat, columnName in metric_columns(name=name, thresholds=thresholds):
+                column = np.full(len(element_ids), np.nan)
+                column[rowIndex[mask]] = statistics[stat][mask]
+                columns[columnName] = column
+        return columns
+
+    def _frame(
+        self, items: list[tuple[int, int, np.ndarray, np.ndarray]]
+    ) -> pd.DataFrame:
+        lengths = [len(values) for _, _, _, values in items]
+        with self._lock:
+            elements, metrics = list(self.elements), list(self.metrics)
+        return pd.DataFrame(
+            {
+                "element": pd.Categorical.from_codes(
+                    np.repeat([item[0] for item in items], lengths).astype(np.int32),
+                    categories=elements,
+                ),
+                "metric": pd.Categorical.from_codes(
+                    np.repeat([item[1] for item in items], lengths).astype(np.int32),
+                    categories=metrics,
+                ),
+                "timestamp": (
+                    np.concatenate([item[2] for item in items])
+                    if items
+                    else np.empty(0, dtype=np.int64)
+                ).view("datetime64[ms]"),
+                "value": (
+                    np.concatenate([item[3] for item in items])
+                    if items
+                    else np.empty(0, dtype=np.float64)
+                ),
+            }
+        )
+
+    def _items(self) -> list[tuple[int, int, np.ndarray, np.ndarray]]:
+        with self._lock:
+            return [
+                (element, code, times, values)
+                for element, metrics in self._series.items()
+                for code, (times, values) in metrics.items()
+            ]
+
+    def frame(self) -> pd.DataFrame:
+        """The whole store as a long table.
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns `element` and `metric` (categorical), `timestamp`
+            (datetime64[ms]) and `value` (float64).
+        """
+
+        return self._frame(self._items())
+
+    def chunks(self, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+        """The long table in slices of about `chunk_size` rows."""
+
+        batch: list[tuple[int, int, np.ndarray, np.ndarray]] = []
+        rowCount = 0
+        for item in self._items():
+            batch.append(item)
+            rowCount += len(item[3])
+            if rowCount >= chunk_size:
+                yield self._frame(batch)
+                batch, rowCount = [], 0
+        if batch:
+            yield self._frame(batch)
+
+    def to_csv(self, path: Path, chunk_size: int = 100_000) -> int:
+        """Write the long table to a CSV file and return its row count."""
+
+        rowCount = 0
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            for index, chunk in enumerate(self.chunks(chunk_size=chunk_size)):
+                chunk.to_csv(file, header=index == 0, index=False)
+                rowCount += len(chunk)
+            if rowCount == 0:
+                self._frame([]).to_csv(file, index=False)
+        return rowCount
+
+
+def store_of(items: Iterable[tuple[str, list[dict]]]) -> MetricStore:
+    """Build a store from `(element_id, metrics)` pairs."""
+
+    store = MetricStore()
+    for element_id, metrics in items:
+        store.add(element_id=element_id, metrics=metrics)
+    return store
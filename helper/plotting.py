@@ -0,0 +1,104 @@
+import os
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from helper.metricstore import MetricSeries
+
+
+def render_canvas(site: str, series: list[MetricSeries], dest_dir: str) -> list[str]:
+    """Plot every metric series of one site into `<dest_dir>/<site>/`
+
+    Draws on standalone `Figure` objects instead of pyplot, so it holds no
+    global state and can run in a worker process or thread.
+
+    Args:
+        site (str): Site name, used as title and folder name
+        series (list[MetricSeries]): Output of `MetricStore.series`
+        dest_dir (str): Output directory
+
+    Returns:
+        list[str]: Errors of metrics that could not be plotted
+    """
+    errors: list[str] = []
+    os.makedirs(name=f"{dest_dir}/{site}", exist_ok=True)
+    for metric in series:
+        try:
+            # Plotted straight from the stored arrays, no per metric frame
+            maxIndex = int(np.nanargmax(metric.values))
+            minIndex = int(np.nanargmin(metric.values))
+            maxPercentage = pd.Timestamp(metric.times[maxIndex])
+            minPercentage = pd.Timestamp(metric.times[minIndex])
+            maxValue = float(metric.values[maxIndex])
+            minValue = float(metric.values[minIndex])
+            fig = Figure(figsize=(15, 6))
+            ax = fig.subplots()
+            fig.subplots_adjust(bottom=0.15)
+            ax.text(
+                x=0.5,
+                y=0.5,
+                s="PANBA V1.2.5 by NTT Data Indonesia",
+                horizontalalignment="center",
+                verticalalignment="center",
+                transform=ax.transAxes,
+                alpha=0.1,
+                zorder=-1,
+                rotation=30,
+                fontsize=30,
+                fontweight=10,
+            )
+            ax.set_title(site)
+            ax.plot(
+                metric.times,
+                metric.values,
+                linestyle="solid",
+                label=metric.name,
+            )
+            ax.plot(
+                maxPercentage,
+                maxValue,
+                "r^",
+                label="Max Percentile",
+            )
+            ax.annotate(
+                f"{maxPercentage.strftime('%d %b')}, {maxValue:.2f}",
+                (maxPercentage, maxValue),
+                xytext=(0, 5),
+                textcoords="offset points",
+                ha="left",
+            )
+            ax.plot(
+                minPercentage,
+                minValue,
+                "gv",
+                label="Min Percentile",
+            )
+            ax.annotate(
+                f"{minPercentage.strftime('%d %b')}, {minValue:.2f}",
+                (minPercentage, minValue),
+                xytext=(0, 5),
+                textcoords="offset points",
+                ha="left",
+            )
+            ax.grid(visible=True, which="both", linestyle=":")
+            ax.set_xlabel("Dates")
+            ax.xaxis.set_minor_locator(mdates.DayLocator())
+            locator = mdates.DayLocator(bymonthday=(1, 10, 20))
+            formatter = mdates.ConciseDateFormatter(locator)
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(formatter)
+            ax.set_ylabel(metric.unit)
+            ax.legend()
+            fig.savefig(
+                fname=f"{dest_dir}/{site}/{metric.name}.png",
+                metadata={
+                    "Title": f"{site}-{metric.name}",
+                    "Copyright": "Reserved By: NTT Indonesia",
+                    "Software": "PANBA V1.2.5 by NTT Indonesia",
+                },
+            )
+        except Exception as error:
+            errors.append(f"Plot {site} - {metric.name}: {error}")
+    return errors
@@ -1,62 +1,437 @@
 import re
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any
+
+import numpy as np
 import pandas as pd
-from statistics import mean
 
+from helper.metricstore import (
+    DEFAULT_THRESHOLDS,
+    MetricStore,
+    metric_columns,
+    store_of,
+)
 
-def average_per_site(tenant: pd.Series, rawData: dict) -> pd.Series:
-    res = tenant.copy()
-    for metric in rawData["data"]["metrics"]:
-        res[metric["series"][0]["name"]] = mean(
-            point["value"] for point in metric["series"][0]["data"][0]["datapoints"]
+INVENTORY_COLUMNS: tuple[str, ...] = (
+    "id",
+    "site_id",
+    "serial_number",
+    "name",
+    "model_name",
+    "software_version",
+    "hw_id",
+)
+# Few distinct values repeated over every element of a tenant
+CATEGORICAL_COLUMNS: tuple[str, ...] = ("model_name", "software_version")
+
+
+class ElementRecord:
+    """Inventory row of one element, as handed to the bulk workers
+
+    Stands in for the `pd.Series` of `iterrows`: indexing by column name,
+    `get`, `keys` (so `dict(record)` works) and `to_dict` behave the same,
+    without building an index per row.
+    """
+
+    __slots__ = INVENTORY_COLUMNS
+
+    def __init__(self, *values) -> None:
+        for key, value in zip(self.__slots__, values):
+            setattr(self, key, value)
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __repr__(self) -> str:
+        return f"ElementRecord({self.to_dict()!r})"
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def keys(self) -> tuple[str, ...]:
+        return self.__slots__
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+def _static_ipv4(item: dict) -> str | None:
+    ipv4 = item.get("ipv4_config") or {}
+    if ipv4.get("type") != "static":
+        return None
+    return (ipv4.get("static_config") or {}).get("address")
+
+
+# Report field name -> value of one interface item
+PORT_FIELDS: dict[str, Callable[[dict], Any]] = {
+    "ipv4": _static_ipv4,
+    "ipv4_type": lambda item: (item.get("ipv4_config") or {}).get("type"),
+    "admin_up": lambda item: item.get("admin_up"),
+    "used_for": lambda item: item.get("used_for"),
+    "mac_address": lambda item: item.get("mac_address"),
+}
+DEFAULT_PORTS: tuple[str, ...] = ("1", "2")
+DEFAULT_PORT_FIELDS: tuple[str, ...] = ("ipv4",)
+
+
+def port_columns(
+    ports: Iterable[str] = DEFAULT_PORTS, fields: Iterable[str] = DEFAULT_PORT_FIELDS
+) -> list[tuple[str, str, str]]:
+    """Report columns of every configured port and field
+
+    Columns are named `<field>_port<port>`, e.g. `ipv4_port1`.
+
+    Args:
+        ports (Iterable[str], optional): Interface names. Defaults to DEFAULT_PORTS.
+        fields (Iterable[str], optional): Keys of `PORT_FIELDS`. Defaults to DEFAULT_PORT_FIELDS.
+
+    Raises:
+        ValueError: A field is not in `PORT_FIELDS`
+
+    Returns:
+        list[tuple[str, str, str]]: (column, port, field) in report order
+    """
+    fields = list(fields)
+    unknown = [field for field in fields if field not in PORT_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown port field {', '.join(unknown)}; use {', '.join(PORT_FIELDS)}"
         )
-    res["ipv4_port1"] = next(
-        (
-            item.get("ipv4_config", {}).get("static_config", {}).get("address")
-            for item in rawData["data"]["interfaces"]
-            if item.get("name") == "1"
-            and item.get("ipv4_config", {}).get("type", None) == "static"
-        ),
-        None,
-    )
-    res["ipv4_port2"] = next(
-        (
-            item.get("ipv4_config", {}).get("static_config", {}).get("address")
-            for item in rawData["data"]["interfaces"]
-            if item.get("name") == "2"
-            and item.get("ipv4_config", {}).get("type", None) == "static"
-        ),
-        None,
+    return [
+        (f"{field}_port{port}", str(port), field) for port in ports for field in fields
+    ]
+
+
+class InterfaceIndex:
+    """Interfaces of one element keyed by name, built in a single pass"""
+
+    __slots__ = ("byName",)
+
+    def __init__(self, interfaces: list[dict]) -> None:
+        # Reversed, so the first interface of a name wins
+        self.byName: dict[str, dict] = {
+            item.get("name"): item for item in reversed(interfaces)
+        }
+
+    def value(self, port: str, field: str):
+        item = self.byName.get(port)
+        return None if item is None else PORT_FIELDS[field](item)
+
+
+def _store_for(
+    tenants: list[ElementRecord | pd.Series | dict],
+    rawData: list[dict],
+    store: MetricStore | None,
+) -> MetricStore:
+    if store is not None:
+        return store
+    return store_of(
+        (tenant["id"], data["data"]["metrics"])
+        for tenant, data in zip(tenants, rawData)
     )
 
-    return res
+
+def _port_columns(
+    rawData: list[dict], ports: list[tuple[str, str, str]] | None = None
+) -> dict[str, list]:
+    ports = port_columns() if ports is None else ports
+    indexes = [
+        InterfaceIndex(interfaces=data["data"]["interfaces"]) for data in rawData
+    ]
+    return {
+        column: [index.value(port=port, field=field) for index in indexes]
+        for column, port, field in ports
+    }
+
+
+def aggregate_rows(
+    tenants: list[ElementRecord | pd.Series | dict],
+    rawData: list[dict],
+    thresholds: dict[str, float] | None = None,
+    store: MetricStore | None = None,
+    ports: list[tuple[str, str, str]] | None = None,
+) -> list[dict]:
+    """Report rows of a batch of elements, see `MetricStore.aggregate`
+
+    Builds plain dicts without going through a DataFrame, which is what the
+    bulk engine journals and streams into its result sink.
+
+    Args:
+        tenants (list[ElementRecord | pd.Series | dict]): Inventory row of
+            each element
+        rawData (list[dict]): `generate_data` result of each element, in
+            the same order
+        thresholds (dict[str, float] | None, optional): See `MetricStore.aggregate`
+        store (MetricStore | None, optional): Store already holding the
+            elements' metrics. Defaults to one built from `rawData`.
+        ports (list[tuple[str, str, str]] | None, optional): Interface
+            columns, see `port_columns`. Defaults to the static IPv4
+            address of ports 1 and 2.
+
+    Returns:
+        list[dict]: One row per element, inventory columns first
+    """
+    columns = {
+        **{
+            key: column.tolist()
+            for key, column in _store_for(tenants, rawData, store)
+            .aggregate(
+                element_ids=[tenant["id"] for tenant in tenants],
+                thresholds=thresholds,
+            )
+            .items()
+        },
+        **_port_columns(rawData=rawData, ports=ports),
+    }
+    return [
+        {**dict(tenant), **{key: column[index] for key, column in columns.items()}}
+        for index, tenant in enumerate(tenants)
+    ]
 
 
-def filter_interfaces(
-    interfaces: list[dict], site_name: str, *args, **kwargs
+def report_columns(
+    metrics: Iterable[str],
+    thresholds: dict[str, float] | None = None,
+    ports: list[tuple[str, str, str]] | None = None,
 ) -> list[str]:
+    """Columns of `aggregate_rows`, in report order
 
-    filter = kwargs.get("filter", {})
-    if not isinstance(filter, list):
-        filter = [
-            ("^DC-|^DRC", "^13"),
-            ("^DCI-", "^13$|^14"),
-        ]
-    # Pre-compile all patterns in filter
-    compiled_filter = [
-        (re.compile(name_pattern), re.compile(interface_pattern))
-        for name_pattern, interface_pattern in filter
+    Rows only hold the metrics their element had, so the order of a report
+    built from the rows alone depends on which row came first.
+
+    Args:
+        metrics (Iterable[str]): Metric names in report order
+        thresholds (dict[str, float] | None, optional): See `MetricStore.aggregate`
+        ports (list[tuple[str, str, str]] | None, optional): Interface
+            columns, see `port_columns`. Defaults to the static IPv4
+            address of ports 1 and 2.
+
+    Returns:
+        list[str]: Inventory, metric and port columns
+    """
+    thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+    ports = port_columns() if ports is None else ports
+    return [
+        *INVENTORY_COLUMNS,
+        *(
+            column
+            for name in metrics
+            for _, column in metric_columns(name=name, thresholds=thresholds)
+        ),
+        *(column for column, _, _ in ports),
     ]
-    for name_regex, interface_regex in compiled_filter:
-        if name_regex.search(site_name):
-            return [
-                interface.get("id")
-                for interface in interfaces
-                if interface_regex.search(interface.get("name", ""))
-            ]
-    # Pre-compile fallback pattern
-    fallback_regex = re.compile("^1$")
+
+
+def average_per_site(
+    tenant: ElementRecord | pd.Series,
+    rawData: dict,
+    thresholds: dict[str, float] | None = None,
+    ports: list[tuple[str, str, str]] | None = None,
+) -> pd.Series:
+    """Single element form of `aggregate_rows`"""
+    return pd.Series(
+        aggregate_rows(
+            tenants=[tenant], rawData=[rawData], thresholds=thresholds, ports=ports
+        )[0]
+    )
+
+
+def site_list_frame(data: dict) -> pd.DataFrame:
+    """Build the element inventory table from an `elements` response
+
+    The items are read in one pass into a fixed set of columns;
+    `CATEGORICAL_COLUMNS` are stored as categoricals.
+
+    Args:
+        data (dict): Output of `ElementOfTenant.request`
+
+    Returns:
+        pd.DataFrame: One row per element with the `INVENTORY_COLUMNS`
+    """
+    return pd.DataFrame.from_records(
+        list(map(itemgetter(*INVENTORY_COLUMNS), data["data"]["items"])),
+        columns=INVENTORY_COLUMNS,
+    ).astype({key: "category" for key in CATEGORICAL_COLUMNS})
+
+
+def element_records(siteList: pd.DataFrame) -> list[ElementRecord]:
+    """Inventory rows of `site_list_frame` as `ElementRecord`s, in order"""
     return [
-        interface.get("id")
-        for interface in interfaces
-        if fallback_regex.search(interface.get("name", ""))
+        ElementRecord(*values)
+        for values in siteList[list(INVENTORY_COLUMNS)].itertuples(
+            index=False, name=None
+        )
     ]
+
+
+def split_metrics_by_element(
+    rawData: dict, element_ids: list[str]
+) -> dict[str, list[dict]]:
+    """Split a batched `sys_metrics` response back into per element metrics
+
+    A batched request filters on several elements and asks for the
+    `{"individual": "element"}` view, so every returned series names its
+    element in `series["view"]["element"]`.
+
+    Args:
+        rawData (dict): Response of a batched `sys_metrics` request
+        element_ids (list[str]): Elements requested in the batch
+
+    Returns:
+        dict[str, list[dict]]: Element id to metric list, shaped like the
+            `metrics` of a single element response
+    """
+    res: dict[str, list[dict]] = {element_id: [] for element_id in element_ids}
+    for metric in rawData["data"]["metrics"]:
+        for series in metric.get("series", []):
+            view = series.get("view")
+            element_id = view.get("element") if isinstance(view, dict) else None
+            if element_id in res:
+                res[element_id].append({"series": [series]})
+    return res
+
+
+DEFAULT_INTERFACE_FILTERS: tuple[tuple[str, str], ...] = (
+    ("^DC-|^DRC", "^13"),
+    ("^DCI-", "^13$|^14"),
+)
+DEFAULT_INTERFACE_FALLBACK = "^1$"
+
+
+class InterfaceRuleIndex:
+    """Compiled interface filter rules
+
+    Each rule pairs a site name pattern with an interface name pattern; the
+    first rule whose site pattern matches picks the interfaces, and sites
+    matching no rule use the fallback pattern. Patterns are compiled once,
+    and both the rule of a site name and the verdict of a rule on an
+    interface name are remembered, so each name is matched only once.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[tuple[str, str]] = DEFAULT_INTERFACE_FILTERS,
+        fallback: str = DEFAULT_INTERFACE_FALLBACK,
+    ) -> None:
+        self.rules: list[tuple[str, str]] = [
+            (name_pattern, interface_pattern)
+            for name_pattern, interface_pattern in rules
+        ]
+        self.siteRegex = [re.compile(name_pattern) for name_pattern, _ in self.rules]
+        # The fallback is the last entry, so a rule index always resolves
+        self.interfaceRegex = [
+            re.compile(interface_pattern) for _, interface_pattern in self.rules
+        ] + [re.compile(fallback)]
+        self.fallback = len(self.rules)
+        self._bySite: dict[str, int] = {}
+        self._byInterface: dict[tuple[int, str], bool] = {}
+
+    def rule_for(self, site_name: str) -> int:
+        """Index of the rule of one site, `fallback` if none matches"""
+        rule = self._bySite.get(site_name)
+        if rule is None:
+            rule = next(
+                (
+                    index
+                    for index, regex in enumerate(self.siteRegex)
+                    if regex.search(site_name)
+                ),
+                self.fallback,
+            )
+            self._bySite[site_name] = rule
+        return rule
+
+    def rules_for(self, site_names: pd.Series | Iterable[str]) -> np.ndarray:
+        """Rule index of every site in one pass per rule
+
+        Args:
+            site_names (pd.Series | Iterable[str]): Site names
+
+        Returns:
+            np.ndarray: One rule index per name, `fallback` where none matches
+        """
+        names = pd.Series(site_names, dtype=object).fillna("").astype(str)
+        res = np.full(len(names), self.fallback, dtype=np.int64)
+        # Later rules first, so the first matching rule is written last
+        for index in range(len(self.rules) - 1, -1, -1):
+            res[names.str.contains(self.siteRegex[index], regex=True).to_numpy()] = (
+                index
+            )
+        self._bySite.update(zip(names.tolist(), res.tolist()))
+        return res
+
+    def select(self, interfaces: list[dict], rule: int) -> list[str]:
+        """Ids of the interfaces whose name matches the pattern of `rule`"""
+        res: list[str] = []
+        for interface in interfaces:
+            key = (rule, interface.get("name", ""))
+            match = self._byInterface.get(key)
+            if match is None:
+                match = self._byInterface[key] = bool(
+                    self.interfaceRegex[rule].search(key[1])
+                )
+            if match:
+                res.append(interface.get("id"))
+        return res
+
+
+@lru_cache(maxsize=8)
+def interface_rule_index(
+    rules: tuple[tuple[str, str], ...] = DEFAULT_INTERFACE_FILTERS,
+    fallback: str = DEFAULT_INTERFACE_FALLBACK,
+) -> InterfaceRuleIndex:
+    """Shared `InterfaceRuleIndex` of a rule set, compiled on first use
+
+    Args:
+        rules (tuple[tuple[str, str], ...], optional): (site pattern,
+            interface pattern) pairs in priority order.
+        fallback (str, optional): Interface pattern of unmatched sites.
+
+    Returns:
+        InterfaceRuleIndex: The same index for the same rules
+    """
+    return InterfaceRuleIndex(rules=rules, fallback=fallback)
+
+
+def rule_index_from_config(bulkConfig: dict) -> InterfaceRuleIndex:
+    """`interface_rule_index` of the `bulk` config section
+
+    Args:
+        bulkConfig (dict): The `bulk` config section
+
+    Raises:
+        ValueError: A rule is not a [site pattern, interface pattern] pair,
+            or a pattern is not a valid regular expression
+
+    Returns:
+        InterfaceRuleIndex: The shared index of the configured rules
+    """
+    rules: list[tuple[str, str]] = []
+    for index, rule in enumerate(
+        bulkConfig.get("interface_filters", DEFAULT_INTERFACE_FILTERS)
+    ):
+        if not isinstance(rule, (list, tuple)) or len(rule) != 2:
+            raise ValueError(
+                f"Interface filter {index} {rule!r} is not a"
+                " [site pattern, interface pattern] pair"
+            )
+        rules.append((str(rule[0]), str(rule[1])))
+    fallback = str(bulkConfig.get("interface_fallback", DEFAULT_INTERFACE_FALLBACK))
+    patterns = [
+        (f"Interface filter {index} {list(rule)!r}", pattern)
+        for index, rule in enumerate(rules)
+        for pattern in rule
+    ] + [("interface_fallback", fallback)]
+    for name, pattern in patterns:
+        try:
+            re.compile(pattern)
+        except re.error as error:
+            raise ValueError(
+                f"{name} has an invalid pattern {pattern!r}: {error}"
+            ) from error
+    return interface_rule_index(rules=tuple(rules), fallback=fallback)
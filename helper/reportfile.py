@@ -0,0 +1,118 @@
+import pickle
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+import pandas as pd
+
+
+def stamped(fileName: str) -> str:
+    """Prefix a file name with the current local time
+
+    Args:
+        fileName (str): File name to prefix
+
+    Returns:
+        str: `YYYYmmdd_HHMMSS-<fileName>`
+    """
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{fileName}"
+
+
+def report_path(fileName: str, dirStr: str | Path, timeStamp: bool = True) -> Path:
+    """Build the absolute path of a report written without a dialog
+
+    Args:
+        fileName (str): Output file name
+        dirStr (str | Path): Destination directory
+        timeStamp (bool, optional): Prefix the name with the time. Defaults to True.
+
+    Returns:
+        Path: The target file
+    """
+    return (Path(dirStr) / (stamped(fileName) if timeStamp else fileName)).absolute()
+
+
+def export_excel_chunks(
+    path: str | Path, chunks: Iterable[pd.DataFrame], sheetName: str = "Sheet1"
+) -> int:
+    """Export DataFrame chunks to one Excel sheet with bounded memory
+
+    Rows are streamed to disk as they are written (xlsxwriter
+    `constant_memory`), so only the current chunk is held in memory. The
+    header is the union of all chunks' columns, in first-seen order; as
+    it has to be written first, the chunks are spooled to a temporary
+    file while the union is collected. Column widths are fitted from the
+    first chunk holding each column.
+
+    Args:
+        path (str | Path): Target file
+        chunks (Iterable[pd.DataFrame]): Consecutive parts of the table
+        sheetName (str, optional): Target sheet name. Defaults to "Sheet1".
+
+    Returns:
+        int: Number of data rows written
+    """
+    columns: Dict[Any, int] = {}
+    chunkCount = 0
+    with tempfile.TemporaryFile() as spool:
+        for chunk in chunks:
+            for column in chunk.columns:
+                if column not in columns:
+                    columns[column] = max(
+                        [len(str(column))]
+                        + chunk[column].map(lambda v: len(str(v))).tolist()
+                    )
+            pickle.dump(chunk, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            chunkCount += 1
+        spool.seek(0)
+        return write_sheet(
+            path=path,
+            columns=columns,
+            rows=(
+                row
+                for _ in range(chunkCount)
+                for row in pickle.load(spool)
+                .reindex(columns=list(columns))
+                .itertuples(index=False, name=None)
+            ),
+            sheetName=sheetName,
+        )
+
+
+def write_sheet(
+    path: str | Path,
+    columns: Dict[Any, int],
+    rows: Iterable[Iterable],
+    sheetName: str = "Sheet1",
+) -> int:
+    """Stream rows already laid out in `columns` order into one sheet
+
+    Args:
+        path (str | Path): Target file
+        columns (Dict[Any, int]): Header in order, each with its text width
+        rows (Iterable[Iterable]): One value per column for every row
+        sheetName (str, optional): Target sheet name. Defaults to "Sheet1".
+
+    Returns:
+        int: Number of data rows written
+    """
+    from xlsxwriter import Workbook
+
+    def _cell(value):
+        if isinstance(value, (list, dict, tuple)):
+            return str(value)
+        return None if pd.isna(value) else value
+
+    workbook = Workbook(filename=str(path), options={"constant_memory": True})
+    ws = workbook.add_worksheet(name=sheetName)
+    ws.write_row(0, 0, [str(column) for column in columns])
+    ws.freeze_panes(1, 0)
+    for col_idx, width in enumerate(columns.values()):
+        ws.set_column(col_idx, col_idx, min(width + 2, 100))
+    rowCount = 0
+    for row in rows:
+        rowCount += 1
+        ws.write_row(rowCount, 0, [_cell(value) for value in row])
+    workbook.close()
+    return rowCount
@@ -0,0 +1,87 @@
+import threading
+from collections.abc import Iterable
+from itertools import islice
+from pathlib import Path
+
+import pandas as pd
+
+from helper.reportfile import write_sheet
+
+WIDTH_ROWS = 5000
+
+
+class ResultSink:
+    """Columnar buffer of report rows
+
+    Rows arrive one at a time from the worker threads and are appended to
+    one list per column, instead of being kept as a `pd.Series` each. A
+    column first seen late is back-filled with None, so rows may differ in
+    their keys. The export writes the columns straight into the sheet.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.columns: dict[str, list] = {}
+        self.rowCount = 0
+
+    def __len__(self) -> int:
+        return self.rowCount
+
+    def append(self, row: dict) -> None:
+        with self._lock:
+            for key, value in row.items():
+                column = self.columns.get(key)
+                if column is None:
+                    column = self.columns[key] = [None] * self.rowCount
+                column.append(value)
+            self.rowCount += 1
+            for column in self.columns.values():
+                if len(column) < self.rowCount:
+                    column.append(None)
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.DataFrame(self.columns)
+
+    def export(
+        self,
+        path: str | Path,
+        sheetName: str = "Sheet1",
+        columns: Iterable[str] = (),
+    ) -> int:
+        """Write every buffered row to `path`
+
+        The buffered columns are written straight into the sheet, without
+        going through DataFrames. Columns listed in `columns` come first, in
+        that order; any other column follows in first-seen order, so the
+        layout does not depend on which row arrived first.
+
+        Args:
+            path (str | Path): Target file
+            sheetName (str, optional): Target sheet name. Defaults to "Sheet1".
+            columns (Iterable[str], optional): Preferred column order, e.g.
+                `processing.report_columns`. Defaults to ().
+
+        Returns:
+            int: Number of rows written
+        """
+        with self._lock:
+            buffered = dict(self.columns)
+            rowCount = self.rowCount
+        order = [key for key in dict.fromkeys(columns) if key in buffered]
+        listed = set(order)
+        order += [key for key in buffered if key not in listed]
+        # Fitted to the leading rows, like a chunked export's first chunk
+        widths = {
+            key: max(
+                [len(str(key))]
+                + [len(str(value)) for value in buffered[key][:WIDTH_ROWS]]
+            )
+            for key in order
+        }
+        return write_sheet(
+            path=path,
+            columns=widths,
+            rows=islice(zip(*(buffered[key] for key in order)), rowCount),
+            sheetName=sheetName,
+        )
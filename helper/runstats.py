@@ -0,0 +1,179 @@
+"""Timing and throughput figures of a bulk run.
+
+Collects one sample per API request (latency, status, bytes) grouped by the
+kind of call, wall time per pipeline stage, and element counts. Worker
+threads record into it concurrently; the UI reads a live snapshot and a JSON
+summary is written when the run ends.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Iterator
+import json
+import threading
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+def _percentiles(samples: list[float]) -> dict[str, float | None]:
+    if not samples:
+        return {f"p{q}": None for q in PERCENTILES}
+    values = np.percentile(samples, PERCENTILES)
+    return {f"p{q}": float(value) for q, value in zip(PERCENTILES, values)}
+
+
+class _RequestStats:
+    __slots__ = ("latencies", "statuses", "retries", "bytes")
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.statuses: Counter[int] = Counter()
+        self.retries = 0
+        self.bytes = 0
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "requests": len(self.latencies),
+            "retries": self.retries,
+            "throttled": self.statuses.get(429, 0),
+            "errors": sum(
+                count
+                for status, count in self.statuses.items()
+                if status == 0 or status >= 400
+            ),
+            "bytes": self.bytes,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "latency_s": {
+                **_percentiles(self.latencies),
+                "mean": float(np.mean(self.latencies)) if self.latencies else None,
+                "max": max(self.latencies, default=None),
+            },
+        }
+
+
+class RunStats:
+    """Thread-safe collector of request and stage timings of one run.
+
+    Parameters
+    ----------
+    total : int
+        Elements this run has to process, used for the ETA.
+    """
+
+    def __init__(self, total: int = 0) -> None:
+        self._lock = threading.Lock()
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.startedAt = datetime.now()
+        self.started = perf_counter()
+        self.requests: dict[str, _RequestStats] = {}
+        self.stages: dict[str, list[float]] = {}
+
+    def _kind(self, kind: str) -> _RequestStats:
+        stats = self.requests.get(kind)
+        if stats is None:
+            stats = self.requests[kind] = _RequestStats()
+        return stats
+
+    def request(self, kind: str, seconds: float, status: int, size: int) -> None:
+        """Record one HTTP round trip; status 0 means no response."""
+
+        with self._lock:
+            stats = self._kind(kind)
+            stats.latencies.append(seconds)
+            stats.statuses[status] += 1
+            stats.bytes += size
+
+    def retry(self, kind: str) -> None:
+        with self._lock:
+            self._kind(kind).retries += 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one sample of stage ``name``."""
+
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - started
+            with self._lock:
+                self.stages.setdefault(name, []).append(elapsed)
+
+    def element_done(self, failed: bool = False) -> None:
+        with self._lock:
+            self.done += 1
+            self.failed += int(failed)
+
+    def progress(self) -> dict[str, float | None]:
+        """Live figures: latency percentiles over all requests, rate, ETA."""
+
+        with self._lock:
+            latencies = [
+                latency
+                for stats in self.requests.values()
+                for latency in stats.latencies
+            ]
+            done = self.done
+        elapsed = perf_counter() - self.started
+        eta = elapsed / done * (self.total - done) if done else None
+        return {
+            **_percentiles(latencies),
+            "rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "eta_s": eta,
+        }
+
+    def progress_text(self) -> str:
+        progress = self.progress()
+        if progress["p50"] is None:
+            return ""
+        eta = progress["eta_s"]
+        etaText = (
+            "--:--" if eta is None else f"{int(eta // 60):02d}:{int(eta % 60):02d}"
+        )
+        return (
+            f"p50 {progress['p50'] * 1000:.0f} ms"
+            f" | p95 {progress['p95'] * 1000:.0f} ms"
+            f" | p99 {progress['p99'] * 1000:.0f} ms"
+            f" | {progress['rps']:.1f} req/s | ETA {etaText}"
+        )
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            elapsed = perf_counter() - self.started
+            requests = {kind: stats.summary() for kind, stats in self.requests.items()}
+            stages = {
+                name: {
+                    "count": len(samples),
+                    "total_s": float(sum(samples)),
+                    "mean_s": float(np.mean(samples)),
+                    **_percentiles(samples),
+                }
+                for name, samples in self.stages.items()
+            }
+            done, failed = self.done, self.failed
+        requestCount = sum(kind["requests"] for kind in requests.values())
+        return {
+            "started_at": self.startedAt.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "elapsed_s": elapsed,
+            "elements": {"total": self.total, "done": done, "failed": failed},
+            "requests_per_s": requestCount / elapsed if elapsed > 0 else 0.0,
+            "elements_per_s": done / elapsed if elapsed > 0 else 0.0,
+            "requests": requests,
+            "stages": stages,
+        }
+
+    def write(self, path: Path) -> Path:
+        """Write :meth:`summary` as JSON to ``path`` and return it."""
+
+        path.write_text(json.dumps(self.summary(), indent=2), encoding="utf-8")
+        return path
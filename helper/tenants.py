@@ -0,0 +1,228 @@
+import json
+import os
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as dt
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+from helper.api.auth import Login
+from helper.api.getlist import RemoteNetworkBandwidth
+from helper.api.ratelimit import RateLimiter
+from helper.api.session import new_session
+from helper.api.tokenprovider import TokenProvider
+from helper.bulkengine import DEFAULT_WORKERS, REPORT_FILE_NAME, BulkEngine, print_log
+from helper.reportfile import export_excel_chunks, report_path
+from helper.settings.apisettings import BWConsSetting
+
+REPORTS = ("bulk", "bandwidth")
+BANDWIDTH_FILE_NAME = "remote_network_bandwidth.xlsx"
+TENANT_KEYS = ("username", "secret", "tsg_id")
+
+
+def load_tenants(path: str | Path) -> list[dict]:
+    """Read the tenants of a multi-tenant run from a JSON file
+
+    The file holds a list of objects with `username`, `secret` and `tsg_id`,
+    and optionally a `name` used for the output folder and log prefix. The
+    name defaults to the TSG ID.
+
+    Args:
+        path (str | Path): JSON file
+
+    Raises:
+        ValueError: A tenant misses a key or two tenants share a name
+
+    Returns:
+        list[dict]: One entry per tenant, in file order
+    """
+    with open(path, encoding="utf-8") as file:
+        tenants: list[dict] = json.load(file)
+    names: set[str] = set()
+    for index, tenant in enumerate(tenants):
+        missing = [key for key in TENANT_KEYS if not tenant.get(key)]
+        if missing:
+            raise ValueError(f"Tenant {index} in {path} misses {', '.join(missing)}")
+        tenant["name"] = str(tenant.get("name") or tenant["tsg_id"])
+        if tenant["name"] in names:
+            raise ValueError(f"Tenant name {tenant['name']} is used twice in {path}")
+        names.add(tenant["name"])
+    return tenants
+
+
+def export_bandwidth(
+    token_provider: TokenProvider,
+    days: int,
+    dest_dir: str | Path,
+    session: requests.Session | None = None,
+    file_name: str = BANDWIDTH_FILE_NAME,
+) -> Path:
+    """Export the Remote Network bandwidth of the last `days` days
+
+    Same query and columns as the Bandwidth Consumption page, streamed into
+    a timestamped Excel file in `dest_dir`.
+
+    Returns:
+        Path: The saved file
+    """
+    properties = [
+        prop for prop in BWConsSetting.propState if BWConsSetting.propState[prop]
+    ]
+    rm = RemoteNetworkBandwidth(
+        bearer_token=token_provider.token,
+        body=RemoteNetworkBandwidth.last_n_days(properties=properties, days=days),
+        session=session,
+    )
+    path = report_path(fileName=file_name, dirStr=dest_dir)
+    export_excel_chunks(
+        path=path, chunks=(pd.DataFrame(rows) for rows in rm.iter_rows())
+    )
+    return path
+
+
+def run_tenant(
+    tenant: dict,
+    start: dt,
+    end: dt,
+    dest_dir: str | Path,
+    reports: Iterable[str] = ("bulk",),
+    config: dict | None = None,
+    workers: int | None = None,
+    generate_plots: bool = False,
+    refresh_cache: bool = False,
+    resume: bool = False,
+    file_name: str = REPORT_FILE_NAME,
+    datapoints: bool = False,
+    tag: str = "bulk",
+    log: Callable[[str], None] = print_log,
+) -> list[Path]:
+    """Log in to one tenant and run its reports
+
+    The tenant gets its own rate limiter, connection pool and token, shared
+    by the login, the bandwidth export and the bulk engine. The bandwidth
+    export always covers the last `end - start` days up to today, as the
+    API only filters relative to now.
+
+    Args:
+        tenant (dict): `username`, `secret` and `tsg_id`, see `load_tenants`
+        start (dt): First day of the bulk report window
+        end (dt): Last day of the bulk report window
+        dest_dir (str | Path): Output directory of this tenant
+        reports (Iterable[str], optional): Any of `REPORTS`. Defaults to ("bulk",).
+        datapoints (bool, optional): Also export the bulk report's daily
+            datapoints as CSV. Defaults to False.
+        tag (str, optional): Journal prefix of the bulk report. Defaults to "bulk".
+        log (Callable[[str], None], optional): Log sink. Defaults to print_log.
+
+    Returns:
+        list[Path]: Saved report files
+    """
+    bulkConfig: dict = config or {}
+    reports = set(reports)
+    Path(dest_dir).mkdir(parents=True, exist_ok=True)
+    rateLimiter = RateLimiter(max_rate=bulkConfig.get("rate_limit", 10.0))
+    session = new_session(
+        rate_limiter=rateLimiter,
+        pool_size=workers or bulkConfig.get("workers", DEFAULT_WORKERS),
+    )
+    tokenProvider = TokenProvider(
+        login=Login(
+            username=tenant["username"],
+            secret=tenant["secret"],
+            tsg_id=tenant["tsg_id"],
+            session=session,
+        )
+    )
+    tokenProvider.start()
+    savedFiles: list[Path] = []
+    try:
+        if "bandwidth" in reports:
+            savedFile = export_bandwidth(
+                token_provider=tokenProvider,
+                days=(end - start).days + 1,
+                dest_dir=dest_dir,
+                session=session,
+            )
+            log(f"Bandwidth exported: {savedFile}")
+            savedFiles.append(savedFile)
+        if "bulk" in reports:
+            engine = BulkEngine(
+                token_provider=tokenProvider,
+                start=start,
+                end=end,
+                dest_dir=dest_dir,
+                config=bulkConfig,
+                workers=workers,
+                generate_plots=generate_plots,
+                refresh_cache=refresh_cache,
+                resume=resume,
+                log=log,
+                rate_limiter=rateLimiter,
+                session=session,
+                tag=tag,
+            )
+            engine.run(siteList=engine.fetch_site_list())
+            log(engine.stats.progress_text())
+            savedFile = engine.export(file_name=file_name)
+            log(f"All Done!, Excel File exported: {savedFile}")
+            savedFiles.append(savedFile)
+            if datapoints:
+                savedFiles.append(engine.export_datapoints())
+    finally:
+        tokenProvider.stop()
+        session.close()
+    return savedFiles
+
+
+def run_tenants(
+    tenants: list[dict],
+    output: str | Path,
+    log: Callable[[str], None] = print_log,
+    **kwargs,
+) -> dict[str, list[Path] | Exception]:
+    """Run `run_tenant` for every tenant at the same time
+
+    One thread per tenant, so the whole run takes about as long as the
+    slowest tenant. Each tenant writes to `<output>/<name>/`, journals under
+    its own tag and prefixes its log lines with its name. A failing tenant
+    does not stop the others.
+
+    Args:
+        tenants (list[dict]): Output of `load_tenants`
+        output (str | Path): Parent directory of the tenant folders
+        **kwargs: Passed on to `run_tenant`
+
+    Returns:
+        dict[str, list[Path] | Exception]: Saved files or the error, per name
+    """
+    if not tenants:
+        return {}
+    # Every engine opens its own plot pool; split the CPUs between them
+    config: dict = dict(kwargs.pop("config", None) or {})
+    config["plot_workers"] = config.get("plot_workers") or max(
+        (os.cpu_count() or 1) // len(tenants), 1
+    )
+
+    def run(tenant: dict) -> list[Path]:
+        name = tenant["name"]
+        return run_tenant(
+            tenant=tenant,
+            dest_dir=Path(output) / name,
+            config=config,
+            tag=f"bulk_{name}",
+            log=lambda line: log(f"[{name}] {line}"),
+            **kwargs,
+        )
+
+    results: dict[str, list[Path] | Exception] = {}
+    with ThreadPoolExecutor(max_workers=len(tenants)) as executor:
+        futures = {tenant["name"]: executor.submit(run, tenant) for tenant in tenants}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as error:
+                log(f"[{name}] Failed: {str(error)}")
+                results[name] = error
+    return results
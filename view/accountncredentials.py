@@ -1,9 +1,9 @@
 import customtkinter as ctk
 from tkinter import messagebox
 from PIL import Image
-from threading import Thread
 
 from helper.api.auth import Login, Profile
+from helper.api.tokenprovider import TokenProvider
 from assets.getfile import GetFile
 from helper.config import decrypt_secret, encrypt_secret, save_config
 
@@ -172,51 +172,28 @@ class AccountNCredentials(ctk.CTkFrame):
                 secret=self.secret.get(),
                 tsg_id=self.tsgId.get(),
             )
-            self.status.set("Getting Profile...")
-            self.controller.authRes = auth.request()
-            profile = Profile(
-                bearer_token=self.controller.authRes["data"]["access_token"]
+            if self.controller.tokenProvider is not None:
+                self.controller.tokenProvider.stop()
+            self.controller.tokenProvider = TokenProvider(
+                login=auth, on_refresh=self.on_token_refresh
             )
+            self.controller.authRes = self.controller.tokenProvider.start()
+            self.status.set("Getting Profile...")
+            profile = Profile(bearer_token=self.controller.tokenProvider.token)
             self.controller.resProfile = profile.request()
             self.status.set("Login Success")
             self.master.activate_menu()
             self.lock_creds()
             # Persist credentials and preference if enabled
             self._persist_credentials()
-            Thread(
-                target=self.after,
-                args=(
-                    (self.controller.authRes.get("data").get("expires_in", 60 * 15) - 1)
-                    * 1000,
-                    self.refresh_token,
-                ),
-                daemon=True,
-            ).start()
         except Exception as error:
             messagebox.showerror(title="Something Went Wrong!", message=error)
             self.status.set("Logging In Failed")
 
-    def refresh_token(self) -> None:
-        expires_in = (
-            self.controller.authRes.get("data").get("expires_in", 60 * 15) - 1
-        ) * 1000
-        if not all([self.username.get(), self.secret.get(), self.tsgId.get()]):
-            return None
-        try:
-            auth = Login(
-                username=self.username.get(),
-                secret=self.secret.get(),
-                tsg_id=self.tsgId.get(),
-            )
-            self.controller.authRes = auth.request()
-            profile = Profile(
-                bearer_token=self.controller.authRes["data"]["access_token"]
-            )
-            self.controller.resProfile = profile.request()
-        except Exception as error:
-            messagebox.showerror(title="Something Went Wrong!", message=error)
-            return None
-        self.after(expires_in, self.refresh_token)
+    def on_token_refresh(self, authRes: dict) -> None:
+        # Runs on the refresher thread; views still reading `authRes` get the
+        # new token on their next request.
+        self.controller.authRes = authRes
 
     def _persist_credentials(self) -> None:
         """Persist current credentials to config if 'Remember me' is enabled.
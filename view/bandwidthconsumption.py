@@ -139,38 +139,27 @@ class BandwidthConsumption(ctk.CTkFrame):
             )
 
     def export_data(self):
-        propList = [
-            {"property": prop}
-            for prop in BWConsSetting.propState
-            if BWConsSetting.propState[prop]
+        properties = [
+            prop for prop in BWConsSetting.propState if BWConsSetting.propState[prop]
         ]
         lw.text_view_render(
             widget=self.logBox,
-            log=f"Count of properties selected: {len(propList)} & Days ago: {self.daysAgo.get()}",
+            log=f"Count of properties selected: {len(properties)} & Days ago: {self.daysAgo.get()}",
+        )
+        body = RemoteNetworkBandwidth.last_n_days(
+            properties=properties, days=int(self.daysAgo.get())
         )
-        body: dict = {
-            "properties": propList,
-            "filter": {
-                "rules": [
-                    {
-                        "property": "event_time",
-                        "operator": "last_n_days",
-                        "values": [int(self.daysAgo.get())],
-                    }
-                ]
-            },
-        }
         lw.text_view_render(widget=self.logBox, log="Requesting Data")
         try:
             rm = RemoteNetworkBandwidth(
                 bearer_token=self.controller.authRes["data"]["access_token"], body=body
             )
-            res = rm.request()["data"]["data"]
-            data = pd.DataFrame(res)
+            count = self.FH.export_excel_chunks(
+                chunks=(pd.DataFrame(rows) for rows in rm.iter_rows())
+            )
             lw.text_view_render(
-                widget=self.logBox, log=f"Data Received\nCount: {len(data)}"
+                widget=self.logBox, log=f"Data Received\nCount: {count}"
             )
-            self.FH.export_excel(data=data)
             lw.text_view_render(
                 widget=self.logBox,
                 log=f"SUCCESS! Data Exported to {self.FH.savedFile}",
@@ -1,27 +1,19 @@
-import os
 from pathlib import Path
 import queue
 import threading
-import asyncio
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import pandas as pd
 import helper.logwriter as lw
 
-from time import time
-from numpy import array_split
 from tkinter import messagebox
 from functools import partial
 from tkcalendar import DateEntry
 from datetime import datetime as dt
-from requests.exceptions import HTTPError
 from dateutil.relativedelta import relativedelta as rdt
 
 from helper.api.getlist import ElementOfTenant
+from helper.bulkengine import BulkEngine
 from helper.filehandler import FileHandler
-from helper.processing import average_per_site, filter_interfaces
-from helper.api.plainfunc import get_all_interfaces, system_metric
+from helper.processing import site_list_frame
 from helper.config import save_config
 
 
@@ -40,18 +32,9 @@ class BulkMetricReporting(ctk.CTkFrame):
         self.dateInput = ctk.StringVar(value=self.now.strftime(format="%m/%d/%Y"))
         self.dateAgo = ctk.StringVar(value=self.agoDate.strftime(format="%m/%d/%Y"))
         self.dateDuration = ctk.IntVar(value=defaultDiff)
-        self.pendingRes: list[pd.Series] = []
-        self.threadLock = threading.Lock()
-        self.metrics: list[dict[str, str | list[str]]] = [
-            {"name": "CPUUsage", "statistics": ["average"], "unit": "percentage"},
-            {"name": "MemoryUsage", "statistics": ["average"], "unit": "percentage"},
-            {"name": "DiskUsage", "statistics": ["average"], "unit": "percentage"},
-            {
-                "name": "InterfaceBandwidthUsage",
-                "statistics": ["average"],
-                "unit": "Mbps",
-            },
-        ]
+        self.engine: BulkEngine | None = None
+        self.automateError: Exception | None = None
+        self.automateExport: Path | None = None
 
         ### Output Dir ###
         outputDirFrame = ctk.CTkFrame(master=self)
@@ -142,6 +125,14 @@ class BulkMetricReporting(ctk.CTkFrame):
         ctk.CTkSwitch(
             master=siteListFrame, variable=self.debugState, text="Debug Mode"
         ).grid(column=2, row=2, padx=5, pady=5, sticky=ctk.N)
+        self.refreshCache = ctk.BooleanVar(value=False)
+        ctk.CTkSwitch(
+            master=siteListFrame, variable=self.refreshCache, text="Refresh Cache"
+        ).grid(column=1, row=3, padx=5, pady=5, sticky=ctk.N)
+        self.resumeRun = ctk.BooleanVar(value=False)
+        ctk.CTkSwitch(
+            master=siteListFrame, variable=self.resumeRun, text="Resume Run"
+        ).grid(column=2, row=3, padx=5, pady=5, sticky=ctk.N)
 
         ### Progress Bar ###
         progressFrame = ctk.CTkFrame(master=self)
@@ -167,6 +158,11 @@ class BulkMetricReporting(ctk.CTkFrame):
             master=progressFrame,
             textvariable=self.automateStringProgress,
         ).pack(pady=10, padx=(0, 10), side=ctk.LEFT)
+        self.automateStats = ctk.StringVar(master=self, value="")
+        ctk.CTkLabel(
+            master=progressFrame,
+            textvariable=self.automateStats,
+        ).pack(pady=10, padx=(0, 10), side=ctk.LEFT)
 
         ### Log Frame ###
         logFrame = ctk.CTkFrame(master=self)
@@ -175,6 +171,7 @@ class BulkMetricReporting(ctk.CTkFrame):
             master=logFrame, wrap="none", state="disabled"
         )
         self.logTerminal.pack(fill=ctk.BOTH, expand=True, pady=5, padx=5)
+        self.logger = lw.TextLogger(widget=self.logTerminal)
 
     def pick_dest_dir(self) -> None:
         # Default to last_export_dir from config when available
@@ -259,39 +256,12 @@ class BulkMetricReporting(ctk.CTkFrame):
             get = threading.Thread(target=self.process_site_list, args=(res,))
             get.start()
         except Exception as error:
-            lw.text_view_render(widget=self.logTerminal, log=str(error))
+            self.logger.log(str(error))
             messagebox.showerror(title="Something Went Wrong!", message=error)
 
     def process_site_list(self, data) -> None:
-        id = []
-        siteId = []
-        name = []
-        modelName = []
-        hwId = []
-        softwareVersion = []
-        serialNumber = []
-        for item in data["data"]["items"]:
-            id.append(item["id"])
-            siteId.append(item["site_id"])
-            name.append(item["name"])
-            modelName.append(item["model_name"])
-            hwId.append(item["hw_id"])
-            softwareVersion.append(item["software_version"])
-            serialNumber.append(item["serial_number"])
-        self.siteList = pd.DataFrame(
-            data={
-                "id": id,
-                "site_id": siteId,
-                "serial_number": serialNumber,
-                "name": name,
-                "model_name": modelName,
-                "software_version": softwareVersion,
-                "hw_id": hwId,
-            }
-        )
-        lw.text_view_render(
-            widget=self.logTerminal, log="number of sites: " + str(len(self.siteList))
-        )
+        self.siteList = site_list_frame(data=data)
+        self.logger.log("number of sites: " + str(len(self.siteList)))
         self.numberOfSites = len(self.siteList)
         self.safeDataButton.configure(state=ctk.ACTIVE)
         self.automateReport.configure(state=ctk.ACTIVE)
@@ -300,9 +270,7 @@ class BulkMetricReporting(ctk.CTkFrame):
         self.FH.save_file_loc(dirStr=self.destDirectory).export_excel(
             data=self.siteList
         )
-        lw.text_view_render(
-            widget=self.logTerminal, log="file saved: " + str(self.FH.savedFile)
-        )
+        self.logger.log("file saved: " + str(self.FH.savedFile))
         # Remember export dir after save
         try:
             self.controller.config.setdefault("paths", {})["last_export_dir"] = str(
@@ -312,230 +280,83 @@ class BulkMetricReporting(ctk.CTkFrame):
         except Exception:
             pass
         if self.debugState.get():
+            self.logger.flush(reschedule=False)
             lw.save_log_to_file(self.logTerminal)
 
     def automate(self) -> None:
         self.automateReport.configure(state=ctk.DISABLED)
-        threadCount: int = 4 if len(self.siteList.index) > 4 else len(self.siteList)
-        data: list = array_split(
-            ary=self.siteList,
-            indices_or_sections=threadCount,
-        )  # HACK: Get Only first (N) of items for dev purposes
+        start, end = self.window()
         self.queuedRes = queue.Queue()
-        workingThreads = []
-        for _ in range(threadCount):
-            worker = threading.Thread(
-                target=asyncio.run, args=(self.iterate_site(data[_]),)
+        self.automateError = None
+        self.automateExport = None
+        # The textbox only keeps the tail; debug mode streams the full log
+        if self.debugState.get():
+            self.logger.stream_to(Path("./PANBA.log"))
+        try:
+            self.engine = BulkEngine(
+                token_provider=self.controller.tokenProvider,
+                start=start,
+                end=end,
+                dest_dir=self.destDirectory,
+                config=self.controller.config.get("bulk", {}),
+                generate_plots=self.generatePlots.get(),
+                refresh_cache=self.refreshCache.get(),
+                resume=self.resumeRun.get(),
+                log=self.logger.log,
+                on_result=self.queuedRes.put,
             )
-            worker.start()
-            workingThreads.append(worker)
+        except Exception as error:
+            # E.g. a bad `bulk` config; nothing has started yet
+            self.logger.log(f"Bulk report failed: {str(error)}")
+            messagebox.showerror(title="Something Went Wrong!", message=error)
+            self.logger.stream_to(None)
+            self.automateReport.configure(state=ctk.ACTIVE)
+            return
+        worker = threading.Thread(target=self.automate_worker)
+        worker.start()
         self.controller.after(
-            100, lambda: self.automate_thread_is_done(workers=workingThreads)
+            100, lambda: self.automate_thread_is_done(workers=[worker])
         )
 
+    def automate_worker(self) -> None:
+        # Runs and exports off the Tk thread; the UI only polls progress.
+        # Errors are kept for the Tk thread, which reports them when done.
+        try:
+            self.engine.run(siteList=self.siteList)
+            self.automateExport = self.engine.export()
+        except Exception as error:
+            self.automateError = error
+
     def automate_thread_is_done(self, workers: list, counter: int = 0) -> None:
         isAllDone: bool = all(not worker.is_alive() for worker in workers)
         while not self.queuedRes.empty():
-            tempRes = self.queuedRes.get()
+            self.queuedRes.get()
             counter += 1
             self.automateFloatProgress.set(counter / self.numberOfSites)
             self.automateStringProgress.set(
                 f"{self.automateFloatProgress.get() * 100:.2f} %"
             )
-            with self.threadLock:
-                self.pendingRes.append(tempRes)
+        self.automateStats.set(self.engine.stats.progress_text())
         if not isAllDone:
             self.controller.after(
                 100,
                 partial(self.automate_thread_is_done, workers=workers, counter=counter),
             )
         else:
-            self.FH.save_file_loc(
-                fileName="site_list_with_resource_metric.xlsx",
-                promptDialog=False,
-                dirStr=self.destDirectory,
-            ).export_excel(
-                data=pd.DataFrame(self.pendingRes).reset_index(drop=True)
-            ).open_explorer()
-            lw.text_view_render(
-                widget=self.logTerminal, log="All Done!, Excel File exported"
-            )
-            if self.debugState.get():
-                lw.save_log_to_file(self.logTerminal)
-            self.automateReport.configure(state=ctk.ACTIVE)
-
-    async def iterate_site(self, siteList: pd.DataFrame) -> None:
-        def send_to_queue(tempRes: pd.Series, isError: bool = False) -> pd.Series:
-            if not isError:
-                return tempRes
-            errorRes = row
-            for each in self.metrics:
-                errorRes[each["name"]] = None
-            return errorRes
-
-        for index, row in siteList.iterrows():
-            isError = False
-            tempRes = pd.Series()
-            start_time = time()
-            lw.text_view_render(
-                widget=self.logTerminal, log=f"Working for  : {index} - {row['name']}"
-            )
-            try:
-                rawData = await self.generate_data(tenant=row)
-                tempRes = average_per_site(tenant=row, rawData=rawData)
-                if self.generatePlots.get():
-                    self.render_canvas(site=row["name"], rawData=rawData)
-                lw.text_view_render(
-                    widget=self.logTerminal,
-                    log=f"Finished in {time() - start_time:.2f} seconds : {index} - {row['name']}",
+            if self.automateError is not None:
+                self.logger.log(f"Bulk report failed: {str(self.automateError)}")
+                messagebox.showerror(
+                    title="Something Went Wrong!", message=self.automateError
                 )
-            except HTTPError as reqError:
-                isError = True
-                lw.text_view_render(
-                    widget=self.logTerminal,
-                    log=f"HTTP Error in {time() - start_time:.2f} seconds : {index} - {row['name']}\nERROR: {str(reqError)}",
-                )
-                continue
-            except Exception as error:
-                isError = True
-                lw.text_view_render(
-                    widget=self.logTerminal,
-                    log=f"Error in {time() - start_time:.2f} seconds while processing: {index} - {row['name']}\nERROR: {str(error)}",
-                )
-                continue
-            finally:
-                self.queuedRes.put(send_to_queue(tempRes, isError))
-
-    async def generate_data(self, tenant: pd.Series | dict, retries: int = 5) -> dict:
-        interfaces = get_all_interfaces(
-            bearer_token=self.controller.authRes["data"]["access_token"],
-            site_id=tenant["site_id"],
-            element_id=tenant["id"],
-        )
-        filtered_interfaces: list[str] = filter_interfaces(
-            interfaces=interfaces["data"]["items"], site_name=tenant["name"]
-        )
-
-        allSum_payload = {
-            "start_time": dt.strptime(
-                f"{self.dateAgo.get()} 00 00",
-                "%m/%d/%Y %H %M",
-            ).isoformat()
-            + ".000Z",
-            "end_time": dt.strptime(
-                f"{self.dateInput.get()} 00 00",
-                "%m/%d/%y %H %M",
-            ).isoformat()
-            + ".000Z",
-            "interval": "1day",
-            "metrics": self.metrics,
-            "filter": {"site": [tenant["site_id"]], "element": [tenant["id"]]},
-        }
+            else:
+                self.FH.savedFile = self.automateExport
+                self.FH.open_explorer()
+                self.logger.log(f"All Done!, Excel File exported: {self.FH.savedFile}")
+            self.logger.stream_to(None)
+            self.automateReport.configure(state=ctk.ACTIVE)
 
-        res = system_metric(
-            bearer_token=self.controller.authRes["data"]["access_token"],
-            body=allSum_payload,
+    def window(self) -> tuple[dt, dt]:
+        return (
+            dt.strptime(f"{self.dateAgo.get()} 00 00", "%m/%d/%Y %H %M"),
+            dt.strptime(f"{self.dateInput.get()} 00 00", "%m/%d/%y %H %M"),
         )
-
-        if len(filtered_interfaces) > 0:
-            interfaces_payload = allSum_payload.copy()
-            interfaces_payload["metrics"] = self.metrics[-1:]
-            interfaces_payload["filter"]["interface"] = filtered_interfaces
-            interfaces_payload["view"] = {"individual": "interface", "summary": True}
-            interfaceRes = system_metric(
-                bearer_token=self.controller.authRes["data"]["access_token"],
-                body=interfaces_payload,
-            )
-            filtered_res: dict[str, str | dict] = next(
-                s
-                for metric in interfaceRes.get("data", {}).get("metrics", [])
-                for s in metric.get("series", [])
-                if s.get("view") == "summary"
-            )
-            filtered_res["name"] = "filteredInterfaceBandwidthUsage"
-            res["data"]["metrics"].append({"series": [filtered_res]})
-
-        res["data"]["interfaces"] = interfaces["data"]["items"]
-
-        return res
-
-    def render_canvas(self, site: str, rawData: dict) -> dict:
-        os.makedirs(name=f"{self.destDirectory}/{site}", exist_ok=True)
-        for metric in rawData["data"]["metrics"]:
-            try:
-                data = pd.DataFrame(
-                    data=metric["series"][0]["data"][0]["datapoints"]
-                ).set_index("time")
-                data.index = pd.to_datetime(data.index)
-                maxPercentage = data["value"].idxmax()
-                minPercentage = data["value"].idxmin()
-                fig, ax = plt.subplots(figsize=(15, 6))
-                fig.subplots_adjust(bottom=0.15)
-                ax.text(
-                    x=0.5,
-                    y=0.5,
-                    s="PANBA V1.2.5 by NTT Data Indonesia",
-                    horizontalalignment="center",
-                    verticalalignment="center",
-                    transform=ax.transAxes,
-                    alpha=0.1,
-                    zorder=-1,
-                    rotation=30,
-                    fontsize=30,
-                    fontweight=10,
-                )
-                ax.set_title(site)
-                ax.plot(
-                    data.index,
-                    data["value"],
-                    linestyle="solid",
-                    label=metric["series"][0]["name"],
-                )
-                ax.plot(
-                    maxPercentage,
-                    data.loc[maxPercentage]["value"],
-                    "r^",
-                    label="Max Percentile",
-                )
-                ax.annotate(
-                    f"{maxPercentage.strftime('%d %b')}, {data.loc[maxPercentage]['value']:.2f}",
-                    (maxPercentage, data.loc[maxPercentage]["value"]),
-                    xytext=(0, 5),
-                    textcoords="offset points",
-                    ha="left",
-                )
-                ax.plot(
-                    minPercentage,
-                    data.loc[minPercentage]["value"],
-                    "gv",
-                    label="Min Percentile",
-                )
-                ax.annotate(
-                    f"{minPercentage.strftime('%d %b')}, {data.loc[minPercentage]['value']:.2f}",
-                    (minPercentage, data.loc[minPercentage]["value"]),
-                    xytext=(0, 5),
-                    textcoords="offset points",
-                    ha="left",
-                )
-                ax.grid(visible=True, which="both", linestyle=":")
-                ax.set_xlabel("Dates")
-                ax.xaxis.set_minor_locator(mdates.DayLocator())
-                locator = mdates.DayLocator(bymonthday=(1, 10, 20))
-                formatter = mdates.ConciseDateFormatter(locator)
-                ax.xaxis.set_major_locator(locator)
-                ax.xaxis.set_major_formatter(formatter)
-                ax.set_ylabel(metric["series"][0]["unit"])
-                ax.legend()
-                plt.savefig(
-                    fname=f"{self.destDirectory}/{site}/{metric['series'][0]['name']}.png",
-                    metadata={
-                        "Title": f"{site}-{metric['series'][0]['name']}",
-                        "Copyright": "Reserved By: NTT Indonesia",
-                        "Software": "PANBA V1.2.5 by NTT Indonesia",
-                    },
-                )
-            except Exception as error:
-                lw.text_view_render(widget=self.logTerminal, log=error)
-                continue
-            finally:
-                plt.close()
@@ -5,11 +5,11 @@ import matplotlib
 matplotlib.use("agg")
 import matplotlib.pyplot as plt
 from matplotlib.ticker import AutoMinorLocator
-import pandas as pd
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime as dt, timedelta
 
 from helper.api.monitor import SysMetric
+from helper.metricstore import store_of
 from view.toplevel.metricvariablesetting import MetricVariableSetting
 
 
@@ -107,13 +107,12 @@ class DeviceMetric(ctk.CTkFrame):
         plt.figure(figsize=(9, 6))
         # plt.style.use("bmh")
         graphIterate: int = 0
-        for graph in data:
-            _ = graph["series"][0]
-            df = pd.DataFrame(data=_["data"][0]["datapoints"])
-            df["time"] = pd.to_datetime(df["time"])
-            axs[graphIterate].set_title(_["name"])
-            axs[graphIterate].set_ylabel(_["unit"])
-            axs[graphIterate].plot_date(df["time"], df["value"], linestyle="solid")
+        for series in store_of([(title, data)]).series(element_id=title):
+            axs[graphIterate].set_title(series.name)
+            axs[graphIterate].set_ylabel(series.unit)
+            axs[graphIterate].plot(
+                series.times, series.values, marker="o", linestyle="solid"
+            )
             axs[graphIterate].xaxis.set_minor_locator(AutoMinorLocator())
             axs[graphIterate].tick_params(axis="x", rotation=270)
             # x_left, x_right = axs[graphIterate].get_xlim()
@@ -137,9 +137,7 @@ class SiteConfiguration(ctk.CTkFrame):
         except Exception as error:
             messagebox.showerror(title="Something Went Wrong!", message=error)
         self.dataPreview = pd.DataFrame(
-            data=[
-                self.FH.flatten_dict(data=row, level=1) for row in res["data"]["items"]
-            ]
+            data=self.FH.flatten_items(items=res["data"]["items"], level=1)
         )
         self.__show_data()
 